@@ -1,14 +1,499 @@
 """
-Import data for advent of code
+Import data for advent of code, and find and run the puzzle solutions.
+
+Solutions live in solutions/day-NN.py, or solutions/day-NN_P.py when a day's
+parts are split across files, and define part_1(data) and/or part_2(data)
+taking the input lines and returning the answer. Run them with:
+
+    python -m aoc2021 run --day N --part P --input PATH
+
+or over every input file in a directory, one JSON line per file, with:
+
+    python -m aoc2021 batch --day N --part P --jobs J DIR
 """
 
 import os
+import re
+import sys
+import glob
+import json
+import mmap
+import time
+import argparse
+import importlib.abc
+import importlib.util
+from array import array
+from operator import lt
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+WHITESPACE = b' \t\r\n\x0b\x0c'
+SOLUTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                             'solutions')
+SOLUTION_FILE = re.compile(r'day-(\d+)(?:_(\d+))?\.py$')
+COMMANDS = ('forward', 'down', 'up', 'backward')
+OPCODES = {c.encode(): i for i, c in enumerate(COMMANDS)}
+SEGMENT = re.compile(rb'\s*(-?\d+)\s*,\s*(-?\d+)\s*->'
+                     rb'\s*(-?\d+)\s*,\s*(-?\d+)\s*')
+
+def input_path(day, puzzle=1, input_dir='data'):
+    return os.path.join(input_dir, f'day-{day:02d}_input-{puzzle}.txt')
+
+def read_lines(path):
+    with open(path, 'r') as f:
+        return [l.strip() for l in f]
 
 def import_data(day, puzzle=1, input_dir = 'data', as_list=True):
-    input_path = os.path.join(input_dir, f'day-{day:02d}_input-{puzzle}.txt')
-    with open(input_path, 'r') as f:
-        data = [l.strip() for l in f.readlines()]
+    data = read_lines(input_path(day, puzzle, input_dir))
 
     if not as_list:
         data = ''.join(data)
-    return data
\ No newline at end of file
+    return data
+
+def stream_data(day, puzzle=1, input_dir='data', as_bytes=False):
+    """
+    Lazily yield the stripped lines of an input file from a memory map, so
+    peak memory stays flat however large the input is. Lines are yielded as
+    str, as import_data would return them, or with as_bytes as zero-copy
+    memoryview slices of the map. A memoryview is released once the next
+    line is requested, so call bytes() on it to keep it.
+    """
+    with open(input_path(day, puzzle, input_dir), 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from _mapped_lines(mm, as_bytes)
+
+def _mapped_lines(mm, as_bytes):
+    size = len(mm)
+    view = memoryview(mm)
+    try:
+        start = 0
+        while start < size:
+            end = mm.find(b'\n', start)
+            if end == -1:
+                end = size
+            next_start = end + 1
+            while start < end and mm[start] in WHITESPACE:
+                start += 1
+            while end > start and mm[end - 1] in WHITESPACE:
+                end -= 1
+            if as_bytes:
+                line = view[start:end]
+                try:
+                    yield line
+                finally:
+                    line.release()
+            else:
+                yield mm[start:end].decode()
+            start = next_start
+    finally:
+        view.release()
+
+def read_data(day, puzzle=1, input_dir='data'):
+    with open(input_path(day, puzzle, input_dir), 'rb') as f:
+        return f.read()
+
+# Parsers ----------------------------------------------------------------------
+# Each parser takes the raw file buffer (bytes or str, e.g. from read_data) and
+# converts it to a typed array in a single pass, without building a list of
+# lines first.
+
+def _as_bytes(buffer):
+    if isinstance(buffer, str):
+        buffer = buffer.encode()
+    return buffer.strip()
+
+def parse_ints(buffer):
+    """One integer per line, e.g. day 1 depths."""
+    return array('q', map(int, _as_bytes(buffer).split()))
+
+def parse_csv_ints(buffer):
+    """Comma separated integers, e.g. day 6 timers and day 7 positions."""
+    buffer = _as_bytes(buffer)
+    if not buffer:
+        return array('q')
+    return array('q', map(int, buffer.split(b',')))
+
+def parse_bits(buffer):
+    """
+    Fixed width binary words, e.g. day 3 diagnostics. Returns the words
+    packed as unsigned integers along with the word width. Words wider than
+    64 bits do not fit an array so are returned as a list of ints. A line
+    of another width or not all bits raises a ValueError.
+    """
+    buffer = _as_bytes(buffer)
+    words = buffer.split()
+    width = len(words[0]) if words else 0
+    if (len(words) != _count_lines(buffer) 
+            or len(set(map(len, words))) > 1
+            or b''.join(words).translate(None, b'01')):
+        def is_word(line):
+            line = line.strip()
+            return len(line) == width and not line.translate(None, b'01')
+        _raise_at_line(buffer, is_word, f'{width} bits')
+    packed = map(int, words, [2] * len(words))
+    if width > 64:
+        return list(packed), width
+    return array('Q', packed), width
+
+def parse_segments(buffer):
+    """
+    'x1,y1 -> x2,y2' segments, e.g. day 5 vents, as a flat array of
+    x1, y1, x2, y2 values, four per segment. Blank lines are skipped and
+    any other line not in that form raises a ValueError.
+    """
+    return parse_segment_lines(_as_bytes(buffer).splitlines())
+
+def parse_segment_lines(lines):
+    """
+    As parse_segments, from an iterable of str, bytes or memoryview lines
+    such as stream_data yields, so only the segment array is ever held in
+    memory.
+    """
+    segments = array('q')
+    for line_no, line in enumerate(lines, 1):
+        if isinstance(line, str):
+            line = line.encode()
+        elif not isinstance(line, bytes):
+            line = bytes(line)
+        if line.strip():
+            segments.extend(_segment_values(line, line_no))
+    return segments
+
+def _segment_values(line, line_no):
+    match = SEGMENT.fullmatch(line)
+    if match is None:
+        raise ValueError(f'line {line_no}: expected x1,y1 -> x2,y2, '
+                         f'got {line!r}')
+    return map(int, match.groups())
+
+def parse_commands(buffer):
+    """
+    'word int' commands, e.g. day 2 movements. Returns an array of opcodes,
+    indexes into COMMANDS, and an array of units. A line that is not a
+    known command and an integer raises a ValueError.
+    """
+    buffer = _as_bytes(buffer)
+    words = buffer.split()
+    valid = len(words) == 2 * _count_lines(buffer)
+    if valid:
+        try:
+            opcodes = array('B', map(OPCODES.__getitem__, words[::2]))
+            units = array('q', map(int, words[1::2]))
+        except (KeyError, ValueError):
+            valid = False
+    if not valid:
+        _raise_at_line(buffer, _is_command, 'command and units')
+    return opcodes, units
+
+def _is_command(line):
+    words = line.split()
+    return (len(words) == 2 and words[0] in OPCODES 
+            and words[1].lstrip(b'+-').isdigit())
+
+def _count_lines(buffer):
+    """The number of non-blank lines in a buffer."""
+    return sum(map(bool, map(bytes.strip, buffer.splitlines())))
+
+def _raise_at_line(buffer, is_valid, expected):
+    """Raise a ValueError for the first non-blank line failing is_valid."""
+    for line_no, line in enumerate(buffer.splitlines(), 1):
+        if line.strip() and not is_valid(line):
+            raise ValueError(f'line {line_no}: expected {expected}, '
+                             f'got {line!r}')
+    raise ValueError('malformed input')
+
+# Sliding windows --------------------------------------------------------------
+def rolling_sums(values, window):
+    """
+    Yield the sum of every full window over an iterable, keeping a running
+    sum and a ring buffer of the last window values.
+    """
+    ring = deque(maxlen=window)
+    total = 0
+    for v in values:
+        if len(ring) == window:
+            total -= ring[0]
+        ring.append(v)
+        total += v
+        if len(ring) == window:
+            yield total
+
+def count_window_increases(values, window=1):
+    """
+    Count how often the sum of a sliding window increases. Neighbouring
+    windows share all but one value, so window i+1 is larger exactly when
+    values[i+window] > values[i] and no sums are needed. Sequences such as
+    lists and arrays are compared in one pass of C-level map, any other
+    iterable is streamed through a ring buffer in O(window) memory.
+    """
+    if hasattr(values, '__getitem__') and hasattr(values, '__len__'):
+        return sum(map(lt, values, islice(values, window, None)))
+
+    values = iter(values)
+    ring = deque(islice(values, window), maxlen=window)
+    increases = 0
+    if len(ring) < window:
+        return increases
+    for v in values:
+        increases += v > ring[0]
+        ring.append(v)
+    return increases
+
+class DepthMonitor:
+    """
+    Count window increases incrementally over an unbounded feed of depths,
+    for several window sizes at once, keeping only the last max(windows)
+    depths. The state can be checkpointed to a file and restored so a
+    restarted process carries on where it left off.
+    """
+    def __init__(self, windows=(1, 3)):
+        self.windows = tuple(sorted(set(windows)))
+        self.recent = deque(maxlen=max(self.windows))
+        self.increases = {w: 0 for w in self.windows}
+        self.n_depths = 0
+
+    def __repr__(self):
+        return f'DepthMonitor({self.snapshot()})'
+
+    def push(self, depth):
+        recent = self.recent
+        n = len(recent)
+        for w in self.windows:
+            if n >= w and depth > recent[n - w]:
+                self.increases[w] += 1
+        recent.append(depth)
+        self.n_depths += 1
+        return self
+
+    def push_many(self, depths):
+        history = list(self.recent)
+        values = history + list(depths)
+        for w in self.windows:
+            start = max(len(history) - w, 0)
+            self.increases[w] += sum(map(lt, islice(values, start, None), 
+                                         islice(values, start + w, None)))
+        self.recent.extend(values[len(history):])
+        self.n_depths += len(values) - len(history)
+        return self
+
+    def snapshot(self):
+        return {'depths': self.n_depths, 'increases': dict(self.increases)}
+
+    def checkpoint(self, path):
+        state = {
+            'windows': self.windows, 
+            'recent': list(self.recent),
+            'increases': list(self.increases.values()),
+            'depths': self.n_depths,
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def restore(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        monitor = cls(state['windows'])
+        monitor.recent.extend(state['recent'])
+        monitor.increases = dict(zip(monitor.windows, state['increases']))
+        monitor.n_depths = state['depths']
+        return monitor
+
+# Solver registry --------------------------------------------------------------
+_loaded_solutions = {}
+
+def find_solvers(solutions_dir=SOLUTIONS_DIR):
+    """
+    Map each (day, part) to the solution file expected to define it, from the
+    file names alone so nothing is imported until a solver is needed.
+    """
+    solvers = {}
+    for name in sorted(os.listdir(solutions_dir)):
+        match = SOLUTION_FILE.match(name)
+        if match is None:
+            continue
+        day = int(match[1])
+        parts = [int(match[2])] if match[2] else [1, 2]
+        for part in parts:
+            solvers[day, part] = os.path.join(solutions_dir, name)
+    return solvers
+
+class SolutionFinder(importlib.abc.MetaPathFinder):
+    """
+    Resolve the solutions.day_NN names load_solution gives solution modules
+    back to their solutions/day-NN.py files, so a fresh interpreter, such
+    as a spawned pool worker unpickling a solution's function, can import
+    them by name.
+    """
+    def find_spec(self, fullname, path=None, target=None):
+        package, _, stem = fullname.rpartition('.')
+        if package != 'solutions' or not stem.startswith('day_'):
+            return None
+        file = os.path.join(SOLUTIONS_DIR, stem.replace('_', '-', 1) + '.py')
+        if not os.path.isfile(file):
+            return None
+        return importlib.util.spec_from_file_location(fullname, file)
+
+def install_solution_finder():
+    # this module may be loaded twice, as __main__ and as aoc2021
+    if not any(type(f).__name__ == 'SolutionFinder' for f in sys.meta_path):
+        sys.meta_path.append(SolutionFinder())
+
+install_solution_finder()
+
+def load_solution(path):
+    """Import a solution file once per process, by path."""
+    if path not in _loaded_solutions:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = 'solutions.' + stem.replace('-', '_')
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        _loaded_solutions[path] = module
+    return _loaded_solutions[path]
+
+def get_solver(day, part, solvers=None):
+    solvers = find_solvers() if solvers is None else solvers
+    if (day, part) not in solvers:
+        raise KeyError(f'No solution found for day {day} part {part}')
+    module = load_solution(solvers[day, part])
+    solver = getattr(module, f'part_{part}', None)
+    if solver is None:
+        raise KeyError(f'{module.__file__} does not define part_{part}')
+    return solver
+
+def run_solver(day, part, path=None, solvers=None):
+    """
+    Solve one part of one day, returning the answer and the seconds taken to
+    load the solution and to solve the puzzle.
+    """
+    path = input_path(day) if path is None else path
+    start = time.perf_counter()
+    solver = get_solver(day, part, solvers)
+    data = read_lines(path)
+    loaded = time.perf_counter()
+    answer = solver(data)
+    solved = time.perf_counter()
+    return answer, loaded - start, solved - loaded
+
+def _solve_file(day, part, path):
+    record = {'file': path, 'day': day, 'part': part}
+    try:
+        answer, _, record['seconds'] = run_solver(day, part, path)
+        record['answer'] = answer
+    except Exception as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+    return record
+
+def run_batch(day, part, paths, jobs=None, ordered=True):
+    """
+    Solve one part of one day for many input files across a pool of worker
+    processes, yielding a result record per file as it completes. Workers
+    are reused across files, so each imports the solution only once.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        if ordered:
+            n = len(paths)
+            chunksize = max(1, n // (4 * jobs))
+            yield from executor.map(_solve_file, [day] * n, [part] * n, 
+                                    paths, chunksize=chunksize)
+        else:
+            futures = [executor.submit(_solve_file, day, part, p) 
+                        for p in paths]
+            for future in as_completed(futures):
+                yield future.result()
+
+# Command line -----------------------------------------------------------------
+def _run_command(args):
+    solvers = find_solvers()
+    selected = [(d, p) for d, p in sorted(solvers) 
+                if args.day in (None, d) and args.part in (None, p)]
+    if not selected:
+        sys.exit(f'No solutions found for day {args.day} part {args.part}')
+    for day, part in selected:
+        answer, load_time, solve_time = run_solver(day, part, args.input, 
+                                                   solvers)
+        print(f'Day {day:02d} part {part}: {answer} '
+              f'(load {load_time*1000:.1f} ms, solve {solve_time*1000:.1f} ms)')
+
+def _batch_command(args):
+    if not os.path.isdir(args.dir):
+        sys.exit(f'No such directory {args.dir}')
+    paths = sorted(p for p in glob.glob(os.path.join(args.dir, args.pattern))
+                    if os.path.isfile(p))
+    if not paths:
+        sys.exit(f'No input files matching {args.pattern} in {args.dir}')
+    for record in run_batch(args.day, args.part, paths, args.jobs, 
+                            not args.unordered):
+        print(json.dumps(record), flush=True)
+
+def _monitor_command(args):
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        monitor = DepthMonitor.restore(args.checkpoint)
+        if (args.window is not None 
+                and tuple(sorted(set(args.window))) != monitor.windows):
+            sys.exit(f'{args.checkpoint} counts windows '
+                     f'{" ".join(map(str, monitor.windows))}, not '
+                     f'{" ".join(map(str, args.window))}')
+    else:
+        monitor = DepthMonitor(args.window or [1, 3])
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        monitor.push(int(line))
+        if monitor.n_depths % args.every == 0:
+            print(json.dumps(monitor.snapshot()), flush=True)
+            if args.checkpoint:
+                monitor.checkpoint(args.checkpoint)
+    if monitor.n_depths % args.every:
+        print(json.dumps(monitor.snapshot()), flush=True)
+    if args.checkpoint:
+        monitor.checkpoint(args.checkpoint)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m aoc2021',
+                                     description='Advent of code 2021')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run and time puzzle solutions')
+    run.add_argument('--day', type=int, help='day to run, default all')
+    run.add_argument('--part', type=int, help='part to run, default all')
+    run.add_argument('--input', help='input file, default the day\'s data')
+    run.set_defaults(func=_run_command)
+
+    batch = commands.add_parser('batch', 
+        help='run a solution over every input file in a directory')
+    batch.add_argument('dir', help='directory of input files')
+    batch.add_argument('--day', type=int, required=True)
+    batch.add_argument('--part', type=int, required=True)
+    batch.add_argument('--pattern', default='*', 
+                       help='glob for input files in dir, default all')
+    batch.add_argument('--jobs', type=int, 
+                       help='worker processes, default one per core')
+    batch.add_argument('--unordered', action='store_true', 
+                       help='write results as they finish, not in file order')
+    batch.set_defaults(func=_batch_command)
+
+    monitor = commands.add_parser('monitor', 
+        help='count day 1 depth increases from a feed on stdin')
+    monitor.add_argument('--window', type=int, nargs='+', 
+                         help='window sizes to count, default 1 3 or those '
+                              'of the checkpoint')
+    monitor.add_argument('--every', type=int, default=1000, 
+                         help='depths between snapshots, default 1000')
+    monitor.add_argument('--checkpoint', 
+                         help='state file to restore from and save to')
+    monitor.set_defaults(func=_monitor_command)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Benchmark the puzzle solutions on synthetic inputs of increasing size.
+
+Each day has a deterministic generator writing an input file in that day's
+puzzle format. Every solver is run on each size in a fresh worker process,
+recording wall time, peak RSS and throughput, and results can be saved as a
+baseline and compared against on later runs:
+
+    python benchmark.py --sizes 3 4 5 --save-baseline baseline.json
+    python benchmark.py --sizes 3 4 5 --baseline baseline.json
+
+Sizes are powers of ten: the number of depths, commands, words, boards,
+segments, fish or crabs in the generated input. Any failing case, or any
+regression beyond the tolerance, makes the run exit with a non-zero status.
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import resource
+import tempfile
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+import aoc2021
+
+# Generators -------------------------------------------------------------------
+# Each writes n items of one puzzle format to the open file f, using rng.
+
+def depth_series(f, n, rng):
+    depth = 1000
+    for _ in range(n):
+        depth = max(0, depth + rng.randint(-20, 25))
+        f.write(f'{depth}\n')
+
+def command_stream(f, n, rng):
+    for _ in range(n):
+        direction = rng.choice(('forward', 'down', 'up'))
+        f.write(f'{direction} {rng.randint(1, 9)}\n')
+
+def diagnostic_words(f, n, rng, width=None):
+    # ratings need distinct words, so walk an odd-stride permutation of the
+    # 2**width words, widening past the puzzle's 12 bits for large n
+    width = width or max(12, n.bit_length() + 2)
+    mask = (1 << width) - 1
+    stride, offset = rng.getrandbits(width) | 1, rng.getrandbits(width)
+    for i in range(n):
+        f.write(f'{(stride * i + offset) & mask:0{width}b}\n')
+
+def bingo_deck(f, n, rng, max_number=99):
+    numbers = list(range(max_number + 1))
+    rng.shuffle(numbers)
+    f.write(','.join(map(str, numbers)) + '\n')
+    for _ in range(n):
+        cells = rng.sample(numbers, 25)
+        f.write('\n')
+        for i in range(0, 25, 5):
+            f.write(' '.join(f'{c:2d}' for c in cells[i:i+5]) + '\n')
+
+def vent_segments(f, n, rng, grid_size=1000):
+    for _ in range(n):
+        x1, y1 = rng.randrange(grid_size), rng.randrange(grid_size)
+        length = rng.randint(1, grid_size // 2)
+        dx, dy = rng.choice(((1, 0), (0, 1), (1, 1), (1, -1)))
+        if rng.random() < 0.5:
+            dx, dy = -dx, -dy
+        x2 = min(max(x1 + dx * length, 0), grid_size - 1)
+        y2 = min(max(y1 + dy * length, 0), grid_size - 1)
+        if dx and dy:
+            # clipping can bend a diagonal, so shorten both to the same length
+            length = min(abs(x2 - x1), abs(y2 - y1))
+            x2, y2 = x1 + dx * length, y1 + dy * length
+        if (x1, y1) == (x2, y2):
+            x2, y2 = (x1 + 1, y1) if x1 + 1 < grid_size else (x1 - 1, y1)
+        f.write(f'{x1},{y1} -> {x2},{y2}\n')
+
+def fish_timers(f, n, rng):
+    f.write(','.join(str(rng.randint(1, 5)) for _ in range(n)) + '\n')
+
+def crab_positions(f, n, rng, max_position=2000):
+    f.write(','.join(str(rng.randint(0, max_position)) for _ in range(n))
+            + '\n')
+
+GENERATORS = {
+    1: depth_series,
+    2: command_stream,
+    3: diagnostic_words,
+    4: bingo_deck,
+    5: vent_segments,
+    6: fish_timers,
+    7: crab_positions,
+}
+
+def generate_input(day, n, path, seed=2021):
+    with open(path, 'w') as f:
+        GENERATORS[day](f, n, random.Random(seed))
+    return path
+
+# Harness ----------------------------------------------------------------------
+def _bench_case(day, part, size, path):
+    try:
+        _, load_time, solve_time = aoc2021.run_solver(day, part, path)
+    except Exception as e:
+        return {'day': day, 'part': part, 'size': size,
+                'error': f'{type(e).__name__}: {e}'}
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {
+        'day': day, 'part': part, 'size': size,
+        'seconds': load_time + solve_time,
+        'peak_rss': peak_rss,
+        'throughput': size / solve_time if solve_time else float('inf'),
+    }
+
+def run_benchmarks(sizes, days=None, seed=2021, input_dir=None):
+    """
+    Yield a result record for every solver at every size, each run in a
+    fresh process so peak RSS belongs to that case alone.
+    """
+    solvers = aoc2021.find_solvers()
+    days = sorted({d for d, _ in solvers}) if days is None else days
+    spawn = get_context('spawn')
+    with tempfile.TemporaryDirectory(dir=input_dir) as tmp:
+        for day in days:
+            parts = sorted(p for d, p in solvers if d == day)
+            for size in sizes:
+                path = os.path.join(tmp, f'day-{day:02d}_{size}.txt')
+                generate_input(day, size, path, seed)
+                for part in parts:
+                    with ProcessPoolExecutor(max_workers=1, 
+                                             mp_context=spawn) as pool:
+                        yield pool.submit(_bench_case, day, part, size,
+                                          path).result()
+                os.remove(path)
+
+def _case_key(record):
+    return f'{record["day"]}.{record["part"]}.{record["size"]}'
+
+def find_regressions(results, baseline, tolerance, min_seconds=0.01):
+    """Compare results against a baseline, returning a message per failure."""
+    regressions = []
+    for record in results:
+        base = baseline.get(_case_key(record))
+        if base is None or 'error' in base:
+            continue
+        name = f'day {record["day"]} part {record["part"]} n={record["size"]}'
+        if 'error' in record:
+            regressions.append(f'{name}: {record["error"]}')
+            continue
+        if (record['seconds'] > base['seconds'] * tolerance
+                and record['seconds'] > min_seconds):
+            regressions.append(f'{name}: {record["seconds"]:.3f}s, '
+                               f'baseline {base["seconds"]:.3f}s')
+        if record['peak_rss'] > base['peak_rss'] * tolerance:
+            regressions.append(f'{name}: {record["peak_rss"] / 2**20:.1f}MB, '
+                               f'baseline {base["peak_rss"] / 2**20:.1f}MB')
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 4, 5],
+                        help='powers of ten to benchmark, default 3 4 5')
+    parser.add_argument('--day', type=int, nargs='+', help='default all days')
+    parser.add_argument('--seed', type=int, default=2021)
+    parser.add_argument('--input-dir',
+                        help='where to write generated inputs, default tmp')
+    parser.add_argument('--baseline', help='baseline json to compare against')
+    parser.add_argument('--save-baseline', help='write results to this json')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='allowed slowdown or growth factor, default 1.25')
+    args = parser.parse_args(argv)
+
+    sizes = [10 ** s for s in args.sizes]
+    results = []
+    print(f'{"day":>3} {"part":>4} {"size":>10} {"seconds":>10} '
+          f'{"peak MB":>8} {"items/s":>12}')
+    for record in run_benchmarks(sizes, args.day, args.seed, args.input_dir):
+        results.append(record)
+        case = f'{record["day"]:>3} {record["part"]:>4} {record["size"]:>10}'
+        if 'error' in record:
+            print(case, record['error'], flush=True)
+            continue
+        print(f'{case} {record["seconds"]:>10.4f} '
+              f'{record["peak_rss"] / 2**20:>8.1f} '
+              f'{record["throughput"]:>12.0f}', flush=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({_case_key(r): r for r in results}, f, indent=2)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print('Regressions against', args.baseline, file=sys.stderr)
+            print(*regressions, sep='\n', file=sys.stderr)
+            failed = True
+    errors = [r for r in results if 'error' in r]
+    if errors:
+        print(f'{len(errors)} cases failed', file=sys.stderr)
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+# importing aoc2021 installs the finder that maps solutions.day_NN module
+# names to the solutions/day-NN.py files, e.g. in spawned pool workers
+import aoc2021
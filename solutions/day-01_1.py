@@ -46,12 +46,64 @@ How many measurements are larger than the previous measurement?
 """
 
 import os
+import json
+import tempfile
+import contextlib
+from io import StringIO
+import aoc2021
 
-input_path = os.path.join('data', 'day-01_input-1.txt')
+def part_1(data):
+    depths = aoc2021.parse_ints('\n'.join(data))
+    return aoc2021.count_window_increases(depths, window=1)
 
-with open(input_path, 'r') as f:
-    raw_data = f.readlines()
+def test_part_1():
+    data = ['199', '200', '208', '210', '200', '207', '240', '269', '260', 
+            '263']
+    assert part_1(data) == 7
+    streamed = aoc2021.count_window_increases(int(d) for d in data)
+    assert streamed == 7
+    assert list(aoc2021.parse_ints(b' 199\n200\n\n208\n')) == [199, 200, 208]
+    assert len(aoc2021.parse_ints('')) == 0
 
-depths = [int(x.replace('\n', '')) for x in raw_data]
-increases = [y > x for x, y in zip(depths[:-1], depths[1:])]
-print("Number of depth increases:", sum(increases))
+def test_batch():
+    data = ['199', '200', '208', '210', '200', '207', '240', '269', '260', 
+            '263']
+    with tempfile.TemporaryDirectory() as tmp:
+        good, bad = os.path.join(tmp, 'a.txt'), os.path.join(tmp, 'b.txt')
+        with open(good, 'w') as f:
+            f.write('\n'.join(data) + '\n')
+        with open(bad, 'w') as f:
+            f.write('199\nforward 5\n')
+        for ordered in [True, False]:
+            records = list(aoc2021.run_batch(1, 1, [good, bad], jobs=2, 
+                                             ordered=ordered))
+            if ordered:
+                assert [r['file'] for r in records] == [good, bad]
+            records = {r['file']: r for r in records}
+            assert records[good]['answer'] == 7
+            assert records[bad]['error'].startswith('ValueError')
+
+        for flags in [[], ['--unordered']]:
+            out = StringIO()
+            with contextlib.redirect_stdout(out):
+                aoc2021.main(['batch', tmp, '--day', '1', '--part', '1', 
+                              '--jobs', '2', *flags])
+            records = [json.loads(l) for l in out.getvalue().splitlines()]
+            assert sorted(r['file'] for r in records) == [good, bad]
+
+        # a missing directory or one without matching files is an error
+        missing = os.path.join(tmp, 'missing')
+        for args in [[missing], [tmp, '--pattern', '*.in']]:
+            try:
+                aoc2021.main(['batch', *args, '--day', '1', '--part', '1'])
+            except SystemExit as e:
+                assert e.code and str(e.code).startswith('No '), e.code
+            else:
+                raise AssertionError(f'expected batch {args} to exit')
+
+if __name__ == "__main__":
+    test_part_1()
+    test_batch()
+    depths = aoc2021.parse_ints(aoc2021.read_data(day=1))
+    print("Number of depth increases:", 
+          aoc2021.count_window_increases(depths))
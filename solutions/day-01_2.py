@@ -45,15 +45,48 @@ than the previous sum?
 """
 
 import os
+import tempfile
+import aoc2021
 
-input_path = os.path.join('data', 'day-01_input-1.txt')
+def part_2(data, window_size=3):
+    depths = aoc2021.parse_ints('\n'.join(data))
+    return aoc2021.count_window_increases(depths, window=window_size)
 
-with open(input_path, 'r') as f:
-    raw_data = f.readlines()
+def test_part_2():
+    data = ['199', '200', '208', '210', '200', '207', '240', '269', '260', 
+            '263']
+    assert part_2(data) == 5
+    depths = [int(d) for d in data]
+    streamed = aoc2021.count_window_increases(iter(depths), window=3)
+    assert streamed == 5
+    assert list(aoc2021.rolling_sums(depths, 3))[:3] == [607, 618, 618]
 
-depths = [int(x.replace('\n', '')) for x in raw_data]
-window_size = 3
-depths_len = len(depths)
-rolling_depths = [sum(depths[i:i+window_size]) for i in range(len(depths)-window_size+1)]
-rolling_increases = [y > x for x, y in zip(rolling_depths[:-1], rolling_depths[1:])]
-print("Number of depth increases:", sum(rolling_increases))
\ No newline at end of file
+def test_monitor():
+    depths = [199, 200, 208, 210, 200, 207, 240, 269, 260, 263]
+    monitor = aoc2021.DepthMonitor(windows=(1, 3))
+    monitor.push(depths[0]).push_many(depths[1:2]).push_many(depths[2:6])
+    for d in depths[6:]:
+        monitor.push(d)
+    assert monitor.snapshot() == {'depths': 10, 'increases': {1: 7, 3: 5}}
+
+    # checkpointing mid-stream and restoring carries on the same count
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'monitor.json')
+        monitor = aoc2021.DepthMonitor(windows=(1, 3)).push_many(depths[:4])
+        monitor.checkpoint(path)
+        restored = aoc2021.DepthMonitor.restore(path).push_many(depths[4:])
+        assert restored.snapshot() == {'depths': 10, 
+                                       'increases': {1: 7, 3: 5}}
+        try:
+            aoc2021.main(['monitor', '--checkpoint', path, '--window', '5'])
+        except SystemExit as e:
+            assert 'counts windows 1 3' in str(e.code), e.code
+        else:
+            raise AssertionError('expected a window mismatch to exit')
+
+if __name__ == "__main__":
+    test_part_2()
+    test_monitor()
+    depths = aoc2021.parse_ints(aoc2021.read_data(day=1))
+    print("Number of depth increases:", 
+          aoc2021.count_window_increases(depths, window=3))
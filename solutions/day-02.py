@@ -78,39 +78,173 @@ you get if you multiply your final horizontal position by your final depth?
 """
 
 import os
-
-input_path = os.path.join('data', 'day-02_input-1.txt')
-
-with open(input_path, 'r') as f:
-    raw_data = f.readlines()
-
-# Part 1 ----------------------
-# clean raw_data
-movements = [x.replace('\n', '').split() for x in raw_data]
-v, h = 0, 0
-for m in movements:
-    direction = m[0]
-    dist = int(m[1])
-    if direction in ['up', 'backward']:
-        dist *= -1
-    if direction in ['up', 'down']:
-        v += dist
-    else:
-        h += dist
-
-print("Part 1 answer:", h*v)
-
-# Part 2 ----------------------
-v, h, aim = 0, 0, 0
-for m in movements:
-    direction = m[0]
-    units = int(m[1])
-    if direction in ['up', 'backward']:
-        units *= -1
-    if direction in ['up', 'down']:
-        aim += units
-    else:
-        h += units
-        v += aim * units
-
-print("Part 2 answer:", h*v)
+import tempfile
+import aoc2021
+from array import array
+from operator import mul
+from itertools import accumulate
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+# sign of the horizontal and vertical move for each of aoc2021.COMMANDS
+HORIZONTAL = (1, 0, 0, -1)
+VERTICAL = (0, 1, -1, 0)
+# largest byte range a worker parses at once when chunking a course file
+MAX_CHUNK_BYTES = 64 << 20
+
+def compile_course(data):
+    """Encode the course once as arrays of horizontal and vertical moves."""
+    return compile_commands(*aoc2021.parse_commands('\n'.join(data)))
+
+def compile_commands(opcodes, units):
+    h_moves = array('q', map(mul, map(HORIZONTAL.__getitem__, opcodes), units))
+    v_moves = array('q', map(mul, map(VERTICAL.__getitem__, opcodes), units))
+    return h_moves, v_moves
+
+def run_course(h_moves, v_moves):
+    """
+    Return the horizontal position, the part 1 depth and the part 2 depth.
+    Part 2's aim is the running sum of the vertical moves, so its depth is
+    the sum of every horizontal move times the aim at that point.
+    """
+    h = sum(h_moves)
+    depth = sum(v_moves)
+    aim_depth = sum(map(mul, h_moves, accumulate(v_moves)))
+    return h, depth, aim_depth
+
+def part_1(data):
+    h, depth, _ = run_course(*compile_course(data))
+    return h*depth
+
+def part_2(data):
+    h, _, aim_depth = run_course(*compile_course(data))
+    return h*aim_depth
+
+# Chunked course files --------
+# The effect of a run of commands starting from aim a is to add dh to the
+# horizontal position, da to the aim and dd + a*dh to the depth, where
+# (dh, da, dd) is its effect starting from aim 0. Chunks of a file can
+# therefore be summarised independently and combined in order.
+
+def chunk_ranges(path, n_chunks):
+    """Split a file into at most n_chunks byte ranges on line boundaries."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, n_chunks):
+            f.seek(max(size * i // n_chunks, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+def summarise_chunk(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        buffer = f.read(end - start)
+    return run_course(*compile_commands(*aoc2021.parse_commands(buffer)))
+
+def combine_summaries(summaries):
+    h, aim, depth = 0, 0, 0
+    for dh, da, dd in summaries:
+        depth += dd + aim * dh
+        h += dh
+        aim += da
+    return h, aim, depth
+
+def run_course_file(path, jobs=None, n_chunks=None, mp_context=None,
+                    max_chunk_bytes=MAX_CHUNK_BYTES):
+    """
+    Return the same horizontal position and part 1 and 2 depths as
+    run_course, summarising byte range chunks of the file in parallel. By
+    default there are four chunks per job, or more to keep each chunk
+    within max_chunk_bytes so a worker's memory stays bounded.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if n_chunks is None:
+        size = os.path.getsize(path)
+        n_chunks = max(4 * jobs, -(-size // max_chunk_bytes))
+    ranges = chunk_ranges(path, n_chunks)
+    with ProcessPoolExecutor(max_workers=jobs, 
+                             mp_context=mp_context) as executor:
+        starts, ends = zip(*ranges) if ranges else ((), ())
+        summaries = executor.map(summarise_chunk, [path] * len(ranges), 
+                                 starts, ends)
+        return combine_summaries(summaries)
+
+# Reference loops --------------
+def parse_movements(data):
+    return [x.split() for x in data]
+
+def navigate(data):
+    movements = parse_movements(data)
+    v, h = 0, 0
+    for m in movements:
+        direction = m[0]
+        dist = int(m[1])
+        if direction in ['up', 'backward']:
+            dist *= -1
+        if direction in ['up', 'down']:
+            v += dist
+        else:
+            h += dist
+    return h*v
+
+def navigate_with_aim(data):
+    movements = parse_movements(data)
+    v, h, aim = 0, 0, 0
+    for m in movements:
+        direction = m[0]
+        units = int(m[1])
+        if direction in ['up', 'backward']:
+            units *= -1
+        if direction in ['up', 'down']:
+            aim += units
+        else:
+            h += units
+            v += aim * units
+    return h*v
+
+def test_course():
+    data = ['forward 5', 'down 5', 'forward 8', 'up 3', 'down 8', 'forward 2',
+            'backward 4', 'up 1', 'forward 3']
+    assert part_1(data) == navigate(data)
+    assert part_2(data) == navigate_with_aim(data)
+    assert part_1(data[:6]) == 150
+    assert part_2(data[:6]) == 900
+    for bad in [['forward 5', 'down'], ['forward 5', 'left 5'], 
+                ['forward x'], ['up 3', 'down 1 2']]:
+        try:
+            part_1(bad)
+        except ValueError as e:
+            assert str(e).startswith(f'line {len(bad)}:'), e
+        else:
+            raise AssertionError(f'expected ValueError for {bad}')
+
+def test_course_file():
+    data = ['forward 5', 'down 5', 'forward 8', 'up 3', 'down 8', 'forward 2',
+            'backward 4', 'up 1', 'forward 3']
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'course.txt')
+        with open(path, 'w') as f:
+            f.write('\n'.join(data) + '\n')
+        for n_chunks in [1, 3, 20]:
+            h, depth, aim_depth = run_course_file(path, 2, n_chunks)
+            assert h*depth == navigate(data)
+            assert h*aim_depth == navigate_with_aim(data)
+        h, depth, aim_depth = run_course_file(path, 2, max_chunk_bytes=5)
+        assert (h*depth, h*aim_depth) == (navigate(data), 
+                                          navigate_with_aim(data))
+
+        # loaded through the registry, the module's functions resolve by name
+        # in spawned workers too
+        module = aoc2021.load_solution(os.path.abspath(__file__))
+        spawned = module.run_course_file(path, 2, 3, get_context('spawn'))
+        assert spawned == run_course_file(path, 2, 3)
+
+if __name__ == "__main__":
+    test_course()
+    test_course_file()
+    data = aoc2021.import_data(day=2)
+    print("Part 1 answer:", part_1(data))
+    print("Part 2 answer:", part_2(data))
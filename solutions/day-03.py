@@ -127,64 +127,123 @@ decimal, not binary.)
 
 
 """
-import os
-from statistics import mode
-from copy import deepcopy
-from functools import reduce
+import aoc2021
 from operator import mul
-
-input_path = os.path.join('data', 'day-03_input-1.txt')
-with open(input_path, 'r') as f:
-    raw_data = f.readlines()
-
-# clean raw_data
-data = [x.replace('\n', '') for x in raw_data]
-
+from bisect import bisect_left
+from collections import Counter
+
+def pack_diagnostics(data):
+    """
+    Pack the report into unsigned integers, an array('Q') for words of up
+    to 64 bits and otherwise a list of Python ints, returning the words and
+    their width.
+    """
+    return aoc2021.parse_bits('\n'.join(data))
 # Part 1 -----------------------------------------------------------------------
-data = [[int(d) for d in x] for x in data]
-digits = [list(d) for d in zip(*data)]
-gamma = [mode(d) for d in digits]
-epsilon = [int(not g) for g in gamma]
-
-def print_bin_list(name, value):
-    print(f'{name}: {"".join([str(v) for v in value])}')
-
-print_bin_list('gamma', gamma)
-print_bin_list('epsilon', epsilon)
-
-def bin_list_to_int(l):
-    bin_str = ''.join([str(d) for d in l])
-    return int(bin_str, 2)
-
-def bin_list_multiply(binary_numbers):    
-    return reduce(mul, [bin_list_to_int(b) for b in binary_numbers])
-
-power = bin_list_multiply([gamma, epsilon])
-print('power:', power)
+def count_ones(words, width):
+    """
+    Count the words with each bit set, most significant bit first. Short
+    words are first counted into a histogram of distinct values, so each bit
+    is then summed over at most 2**width values rather than every word.
+    """
+    weights = None
+    if (1 << width) < len(words):
+        histogram = Counter(words)
+        words, weights = list(histogram.keys()), list(histogram.values())
+    ones = []
+    for bit in reversed(range(width)):
+        is_set = map((1 << bit).__and__, words)
+        if weights is None:
+            ones.append(sum(is_set) >> bit)
+        else:
+            ones.append(sum(map(mul, is_set, weights)) >> bit)
+    return ones
+
+def get_gamma_epsilon(words, width):
+    n_words = len(words)
+    gamma = 0
+    for n_ones in count_ones(words, width):
+        gamma = (gamma << 1) | (2 * n_ones >= n_words)
+    epsilon = gamma ^ ((1 << width) - 1)
+    return gamma, epsilon
+
+def part_1(data):
+    gamma, epsilon = get_gamma_epsilon(*pack_diagnostics(data))
+    return gamma * epsilon
 
 # Part 2 -----------------------------------------------------------------------
-def get_bit_criteria(data, bit, most_common):
-    n_ones = sum([b[bit] for b in data])
-    n_zeros = len(data) - n_ones
-    bit_criteria = n_ones >= n_zeros    
-    if not most_common:
-        bit_criteria = not bit_criteria
-    return int(bit_criteria)
-
-
-def get_rating(data, most_common):
-    rating = deepcopy(data)
-    n_bits = len(rating[0])
-    for i in range(n_bits):
-        bit_criteria = get_bit_criteria(rating, i, most_common)
-        rating = list(filter(lambda d: d[i]==bit_criteria, rating))
-        if len(rating)==1:
-            return rating[0]
-
-# gamma represents the most common bits
-o2_gen_rating = get_rating(data, True)
-co2_scrubber_rating = get_rating(data, False)
-life_support_rating = bin_list_multiply([o2_gen_rating, co2_scrubber_rating])
-print_bin_list("Oxygen generator rating", o2_gen_rating)
-print_bin_list("CO2 scrubber rating", co2_scrubber_rating)
-print("Life support rating:", life_support_rating)
+class RatingIndex:
+    """
+    The report's words sorted once, so the words sharing any prefix of bits
+    form a contiguous range that a binary search splits on the next bit.
+    A rating is found in O(width log n) without copying or filtering, and
+    the index can answer any number of rating queries.
+    """
+    def __init__(self, words, width):
+        self.words = sorted(words)
+        self.width = width
+
+    def rating(self, most_common):
+        lo, hi = 0, len(self.words)
+        prefix = 0
+        for bit in reversed(range(self.width)):
+            if hi - lo <= 1:
+                break
+            # words[lo:hi] all start with prefix, those from split have bit set
+            split = bisect_left(self.words, prefix | (1 << bit), lo, hi)
+            n_zeros, n_ones = split - lo, hi - split
+            keep_ones = (n_ones >= n_zeros) == most_common
+            if (keep_ones and n_ones) or not n_zeros:
+                lo = split
+                prefix |= 1 << bit
+            else:
+                hi = split
+        return self.words[lo]
+
+def get_life_support_ratings(words, width):
+    index = RatingIndex(words, width)
+    # gamma represents the most common bits
+    o2_gen_rating = index.rating(True)
+    co2_scrubber_rating = index.rating(False)
+    return o2_gen_rating, co2_scrubber_rating
+
+def part_2(data):
+    o2_gen_rating, co2_scrubber_rating = get_life_support_ratings(
+        *pack_diagnostics(data))
+    return o2_gen_rating * co2_scrubber_rating
+
+def test_diagnostics():
+    data = ['00100', '11110', '10110', '10111', '10101', '01111', '00111', 
+            '11100', '10000', '11001', '00010', '01010']
+    assert count_ones(*pack_diagnostics(data)) == [7, 5, 8, 7, 5]
+    assert part_1(data) == 198
+    assert part_1(data * 10) == 198
+    wide = ['1' + '0' * 69, '1' * 70, '0' * 70]
+    assert count_ones(*pack_diagnostics(wide)) == [2] + [1] * 69
+    assert get_life_support_ratings(*pack_diagnostics(data)) == (23, 10)
+    assert part_2(data) == 230
+    for bad in [['101', '11'], ['101', '1a1'], ['101', '11 0']]:
+        try:
+            pack_diagnostics(bad)
+        except ValueError as e:
+            assert str(e).startswith('line 2:'), e
+        else:
+            raise AssertionError(f'expected ValueError for {bad}')
+
+def solution():
+    raw_data = aoc2021.import_data(day=3)
+    words, width = pack_diagnostics(raw_data)
+    gamma, epsilon = get_gamma_epsilon(words, width)
+    print(f'gamma: {gamma:0{width}b}')
+    print(f'epsilon: {epsilon:0{width}b}')
+    print('power:', gamma * epsilon)
+
+    o2_gen_rating, co2_scrubber_rating = get_life_support_ratings(words, 
+                                                                  width)
+    print(f'Oxygen generator rating: {o2_gen_rating:0{width}b}')
+    print(f'CO2 scrubber rating: {co2_scrubber_rating:0{width}b}')
+    print("Life support rating:", o2_gen_rating * co2_scrubber_rating)
+
+if __name__ == "__main__":
+    test_diagnostics()
+    solution()
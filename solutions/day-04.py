@@ -97,23 +97,31 @@ be?
 
 """
 
-from copy import deepcopy
 import re
-from itertools import product
+import random
+from copy import deepcopy
+from array import array
+from itertools import product, repeat
+from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
 import aoc2021
 
-raw_data = aoc2021.import_data(day=4)
-
 class Board:
+    __slots__ = ('_raw_grid', 'values', 'grid', 'marks', 'score', 'bingo')
     size = 5
     def __init__(self, grid_values):
         self._raw_grid = grid_values
         self.values = {v: (i, j) for i, row in enumerate(self._raw_grid) 
                                 for j, v in enumerate(row)}
         self.grid = {v: k for k, v in self.values.items()}
-        self.marks = {k: False for k in list(product(*[range(self.size)]*2))}
+        self.reset()
+
+    def reset(self):
+        """Clear the marks and score so the board can play another game."""
+        self.marks = {k: False for k in product(range(self.size), repeat=2)}
         self.score = 0
         self.bingo = False
+        return self
 
     def __repr__(self):
         return f'Board({self._raw_grid})'
@@ -122,7 +130,7 @@ class Board:
         if n in self.values:            
             idx = self.values[n]
             self.marks[idx] = True
-            self.bingo = self._check_bingo(idx)
+            self.bingo = self.bingo or self._check_bingo(idx)
         
         if self.bingo:
             self._score_board(n)
@@ -136,13 +144,138 @@ class Board:
         return bingo
 
     def _score_board(self, n):
-        for k, v in self.marks.items():
-            if not v:
-                self.score += self.grid[k]
-        self.score *= n
+        unmarked = sum(self.grid[k] for k, v in self.marks.items() if not v)
+        self.score = unmarked * n
         return self.score
 
-def process_data(raw_data):
+class BingoEngine:
+    """
+    Every board in one flat array of cells, 25 per board, with an index from
+    each number to the cells holding it and per board counts of the marked
+    cells in each row and column. A draw only touches the cells holding the
+    number drawn, however many boards there are.
+
+    The layout, cells and cells_by_number, is fixed once built. Marks live
+    in separate state that reset clears, and ranking reads only the layout,
+    so one parsed deck can be replayed against any number of draw orders.
+    """
+    __slots__ = ('n_boards', 'cells', 'cells_by_number', 'marked', 
+                 'row_counts', 'col_counts', 'unmarked_sums', 'won')
+    size = 5
+
+    def __init__(self, grids):
+        self.n_boards = len(grids)
+        self.cells = array('q', (v for grid in grids for row in grid 
+                                    for v in row))
+        self.cells_by_number = defaultdict(list)
+        for i, v in enumerate(self.cells):
+            self.cells_by_number[v].append(i)
+        self.reset()
+
+    def reset(self):
+        n_cells = self.size * self.size
+        self.marked = bytearray(len(self.cells))
+        self.row_counts = bytearray(self.n_boards * self.size)
+        self.col_counts = bytearray(self.n_boards * self.size)
+        self.unmarked_sums = array('q', (sum(self.cells[i:i+n_cells]) 
+                                for i in range(0, len(self.cells), n_cells)))
+        self.won = bytearray(self.n_boards)
+
+    def draw(self, n):
+        """Mark n, returning (board, score) for each board it completes."""
+        size = self.size
+        winners = []
+        for cell in self.cells_by_number.get(n, ()):
+            if self.marked[cell]:
+                continue
+            self.marked[cell] = 1
+            board, position = divmod(cell, size * size)
+            i, j = divmod(position, size)
+            self.unmarked_sums[board] -= n
+            row, col = board * size + i, board * size + j
+            self.row_counts[row] += 1
+            self.col_counts[col] += 1
+            bingo = (self.row_counts[row] == size 
+                        or self.col_counts[col] == size)
+            if bingo and not self.won[board]:
+                self.won[board] = 1
+                winners.append(board)
+        winners.sort()
+        return [(b, self.unmarked_sums[b] * n) for b in winners]
+
+    def play(self, numbers_drawn):
+        """Yield (round, number, board, score) for every board as it wins."""
+        for i, n in enumerate(numbers_drawn):
+            for board, score in self.draw(n):
+                yield i, n, board, score
+
+    def ranking(self, numbers_drawn):
+        """
+        Return (round, number, board, score) for every board that wins, in
+        the order play would yield them, without simulating the draws. A
+        board wins in the round its first line completes: the minimum over
+        its lines of the latest round any cell in the line is drawn.
+        """
+        size = self.size
+        n_cells = size * size
+        never = len(numbers_drawn)
+        draw_round = {}
+        for i, n in enumerate(numbers_drawn):
+            draw_round.setdefault(n, i)
+        rounds = array('q', map(draw_round.get, self.cells, repeat(never)))
+
+        ranking = []
+        for board in range(self.n_boards):
+            start = board * n_cells
+            board_rounds = rounds[start:start + n_cells]
+            rows = map(max, (board_rounds[i:i + size] 
+                                for i in range(0, n_cells, size)))
+            cols = map(max, (board_rounds[j::size] for j in range(size)))
+            win_round = min(min(rows), min(cols))
+            if win_round == never:
+                continue
+            unmarked = sum(v for v, r in zip(self.cells[start:start + n_cells],
+                                             board_rounds) if r > win_round)
+            n = numbers_drawn[win_round]
+            ranking.append((win_round, n, board, unmarked * n))
+        ranking.sort()
+        return ranking
+
+def _count_first_winners(engine, numbers_drawn, n_trials, seed):
+    rng = random.Random(seed)
+    draw_order = list(numbers_drawn)
+    first_winners = Counter()
+    for _ in range(n_trials):
+        rng.shuffle(draw_order)
+        ranking = engine.ranking(draw_order)
+        if ranking:
+            first_round = ranking[0][0]
+            first_winners.update(board for win_round, _, board, _ in ranking
+                                 if win_round == first_round)
+    return first_winners
+
+def count_first_winners(engine, numbers_drawn, n_trials, seed=0, jobs=1):
+    """
+    Shuffle the draw order n_trials times and count how often each board
+    wins first. Every board completing a line in the first winning round
+    is credited, so with ties the counts sum to more than n_trials. Trials
+    are split across jobs worker processes, each sent the engine's layout
+    once, and the counts are reproducible for a given seed and number of
+    jobs.
+    """
+    trials = [n_trials // jobs + (i < n_trials % jobs) for i in range(jobs)]
+    if jobs == 1:
+        return _count_first_winners(engine, numbers_drawn, n_trials, seed)
+    first_winners = Counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        counts = executor.map(_count_first_winners, repeat(engine, jobs), 
+                              repeat(numbers_drawn, jobs), trials, 
+                              range(seed, seed + jobs))
+        for c in counts:
+            first_winners.update(c)
+    return first_winners
+
+def parse_deck(raw_data):
     def str_to_list_of_int(l):
         return [int(v) for v in re.split(" |,", l) if len(v) > 0]
     numbers_drawn = str_to_list_of_int(raw_data[0])
@@ -150,32 +283,43 @@ def process_data(raw_data):
     board_size = 5
     board_start = 2
 
-    boards = []
+    grids = []
     current_board = []
     for l in raw_data[board_start:]:
         if len(l) > 0:
             current_board.append(str_to_list_of_int(l))
         else:   
-            boards.append(Board(current_board))
+            grids.append(current_board)
             current_board = []
+    if current_board:
+        grids.append(current_board)
 
-    return numbers_drawn, boards
+    return numbers_drawn, grids
+
+def process_data(raw_data):
+    numbers_drawn, grids = parse_deck(raw_data)
+    return numbers_drawn, [Board(g) for g in grids]
 
 def print_board_info(numbers_drawn, n, board):
     print("Round:", numbers_drawn, "Last number drawn:", n)
     print("Board:", board)
     print("Score:", board.score)
 
-def find_winner(numbers_drawn, boards):
+def find_winner(numbers_drawn, boards, verbose=True):
+    for b in boards:
+        b.reset()
     for i, n in enumerate(numbers_drawn):
         for b in boards:
             bingo = b.mark_board(n)
             if bingo:
-                print("-----Winner-----")
-                print_board_info(i, n, b)
+                if verbose:
+                    print("-----Winner-----")
+                    print_board_info(i, n, b)
                 return b.score
 
-def find_loser(numbers_drawn, boards):
+def find_loser(numbers_drawn, boards, verbose=True):
+    for b in boards:
+        b.reset()
     draw_stack = deepcopy(numbers_drawn)
     draw_stack.reverse()
     while len(boards) > 1:
@@ -187,10 +331,82 @@ def find_loser(numbers_drawn, boards):
         n = draw_stack.pop()
         bingo = last_board.mark_board(n)
         if bingo:
-            print("-----Loser-----")
-            print_board_info(len(draw_stack), n, last_board)
+            if verbose:
+                print("-----Loser-----")
+                print_board_info(len(draw_stack), n, last_board)
             return last_board.score
 
-numbers_drawn, boards = process_data(raw_data)
-winning_score = find_winner(numbers_drawn, boards)
-losing_score = find_loser(numbers_drawn, boards)
\ No newline at end of file
+def part_1(data):
+    numbers_drawn, grids = parse_deck(data)
+    ranking = BingoEngine(grids).ranking(numbers_drawn)
+    return ranking[0][-1] if ranking else None
+
+def part_2(data):
+    numbers_drawn, grids = parse_deck(data)
+    ranking = BingoEngine(grids).ranking(numbers_drawn)
+    return ranking[-1][-1] if ranking else None
+
+def load_test_data():
+    test_data = [
+        "7,4,9,5,11,17,23,2,0,14,21,24,10,16,13,6,15,25,12,22,18,20,8,19,"
+        "3,26,1",
+        "",
+        "22 13 17 11  0",
+        " 8  2 23  4 24",
+        "21  9 14 16  7",
+        " 6 10  3 18  5",
+        " 1 12 20 15 19",
+        "",
+        " 3 15  0  2 22",
+        " 9 18 13 17  5",
+        "19  8  7 25 23",
+        "20 11 10 24  4",
+        "14 21 16 12  6",
+        "",
+        "14 21 17 24  4",
+        "10 16 15  9 19",
+        "18  8 23 26 20",
+        "22 11 13  6  5",
+        " 2  0 12  3  7",
+    ]
+    return test_data
+
+def test_engine():
+    data = load_test_data()
+    assert part_1(data) == 4512
+    assert part_2(data) == 1924
+    numbers_drawn, grids = parse_deck(data)
+    engine = BingoEngine(grids)
+    wins = [(i, b) for i, _, b, _ in engine.play(numbers_drawn)]
+    assert wins == [(11, 2), (13, 0), (14, 1)]
+    engine.reset()
+    assert engine.ranking(numbers_drawn) == list(engine.play(numbers_drawn))
+
+def test_replay():
+    numbers_drawn, boards = process_data(load_test_data())
+    for _ in range(2):
+        assert find_winner(numbers_drawn, boards, verbose=False) == 4512
+        assert find_loser(numbers_drawn, boards, verbose=False) == 1924
+
+    engine = BingoEngine(parse_deck(load_test_data())[1])
+    first_winners = count_first_winners(engine, numbers_drawn, 200, seed=1)
+    assert sum(first_winners.values()) >= 200
+    assert first_winners == count_first_winners(engine, numbers_drawn, 200, 
+                                                seed=1)
+    parallel = count_first_winners(engine, numbers_drawn, 200, jobs=2)
+    assert sum(parallel.values()) >= 200
+
+    # a board tied with the first winner is credited too, not only the
+    # lowest numbered
+    grids = parse_deck(load_test_data())[1]
+    twinned = BingoEngine(grids + grids[:1])
+    first_winners = count_first_winners(twinned, numbers_drawn, 200, seed=1)
+    assert first_winners[0] == first_winners[3] > 0
+
+if __name__ == "__main__":
+    test_engine()
+    test_replay()
+    raw_data = aoc2021.import_data(day=4)
+    numbers_drawn, boards = process_data(raw_data)
+    winning_score = find_winner(numbers_drawn, boards)
+    losing_score = find_loser(numbers_drawn, boards)
\ No newline at end of file
@@ -90,11 +90,23 @@ larger - now a total of 12 points.
 Consider all of the lines. At how many points do at least two lines overlap?
 """
 
+import os
+import sys
+import mmap
+import tempfile
 import aoc2021
 from math import copysign
-from collections import defaultdict
+from array import array
+from operator import add, sub
+from itertools import repeat, accumulate, compress
+from functools import partial
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 class Coord():
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -108,12 +120,15 @@ class Coord():
 class Line():
 
     class Dim():
+        __slots__ = ('vector', 'length', 'step', 'dim_range')
+
         def __init__(self, start, end):
             self.vector = end - start
             self.length = abs(self.vector)
             self.step = int(copysign(1, self.vector))
             self.dim_range = range(start, end + self.step, self.step)
 
+    __slots__ = ('start', 'end', 'x_dim', 'y_dim', 'max_dim', 'orientation')
 
     def __init__(self, input):
         self.start, self.end = self._parse_input(input)
@@ -122,7 +137,11 @@ class Line():
         self.y_dim = self.Dim(self.start.y, self.end.y)        
         self.max_dim = max([self.x_dim.length, self.y_dim.length])
         self.orientation = self._get_orientation()
-        self.coords = self._get_coords()
+
+    @property
+    def coords(self):
+        """The line's points, generated on each access rather than stored."""
+        return self._get_coords()
 
     def _parse_input(self, input):
         def coord_from_string(coord_string):
@@ -205,25 +224,539 @@ def test_puzzle_1():
     danger_points = solve_puzzle(data, ['h', 'v'])
     assert danger_points == 5
 
+# Rasterized seafloor ----------------------------------------------------------
+# Segments are held as one flat array of x1, y1, x2, y2 values and the
+# seafloor is rasterized a row at a time. Each non horizontal line adds +1
+# to a running counter when the sweep reaches its first row and -1 after its
+# last: vertical lines at their x, and diagonals at their x - y or x + y so
+# each row reads them from a sliding slice of the diagonal counters.
+# Horizontal lines are added to their row from a difference array.
+
+# cells of bounding box allowed per covered point before going sparse
+DENSE_CELLS_PER_POINT = 16
+
+def parse_segments(data):
+    return aoc2021.parse_segment_lines(data)
+
+def get_orientation(x1, y1, x2, y2):
+    if x1 == x2:
+        return 'v'
+    elif y1 == y2:
+        return 'h'
+    return 'd'
+
+class LineSet:
+    """
+    Segments held as columns, arrays of their start and end coordinates and
+    a byte per segment for its orientation, rather than as Line objects.
+    Filtering and slicing build new columns, and points are generated only
+    when asked for. Iterating yields each segment as x1, y1, x2, y2.
+    """
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'orientations')
+
+    def __init__(self, x1, y1, x2, y2, orientations=None):
+        lengths = {len(c) for c in (x1, y1, x2, y2)}
+        if orientations is not None:
+            lengths.add(len(orientations))
+        if len(lengths) > 1:
+            raise ValueError(f'columns of unequal lengths {sorted(lengths)}')
+        self.x1, self.y1, self.x2, self.y2 = x1, y1, x2, y2
+        if orientations is None:
+            orientations = map(get_orientation, x1, y1, x2, y2)
+            orientations = ''.join(orientations).encode()
+        self.orientations = orientations
+
+    @classmethod
+    def from_segments(cls, segments):
+        """Build from a flat array of x1, y1, x2, y2 values."""
+        if len(segments) % 4:
+            raise ValueError(f'{len(segments)} values is not a whole number '
+                             'of segments')
+        return cls(*(segments[i::4] for i in range(4)))
+
+    def __len__(self):
+        return len(self.x1)
+
+    def __iter__(self):
+        return zip(self.x1, self.y1, self.x2, self.y2)
+
+    def __getitem__(self, index):
+        columns = (self.x1, self.y1, self.x2, self.y2, self.orientations)
+        if isinstance(index, slice):
+            return LineSet(*(c[index] for c in columns))
+        return tuple(c[index] for c in columns[:4])
+
+    def __repr__(self):
+        return f'LineSet({len(self)} segments)'
+
+    def filter(self, orientations):
+        wanted = set(''.join(orientations).encode())
+        mask = bytes(map(wanted.__contains__, self.orientations))
+        columns = (self.x1, self.y1, self.x2, self.y2)
+        return LineSet(*(array('q', compress(c, mask)) for c in columns), 
+                       bytes(compress(self.orientations, mask)))
+
+    def bounds(self):
+        x1, y1, x2, y2 = self.x1, self.y1, self.x2, self.y2
+        return (min(min(x1), min(x2)), min(min(y1), min(y2)), 
+                max(max(x1), max(x2)), max(max(y1), max(y2)))
+
+    def n_points(self):
+        """The total number of points on the segments."""
+        widths = map(abs, map(sub, self.x2, self.x1))
+        heights = map(abs, map(sub, self.y2, self.y1))
+        return sum(map(max, widths, heights)) + len(self)
+
+    def coords(self):
+        """Lazily yield the points of every segment, x, y, in order."""
+        for x1, y1, x2, y2 in self:
+            n = max(abs(x2 - x1), abs(y2 - y1)) + 1
+            x_step = (x2 > x1) - (x2 < x1)
+            y_step = (y2 > y1) - (y2 < y1)
+            xs = range(x1, x2 + x_step, x_step) if x_step else repeat(x1, n)
+            ys = range(y1, y2 + y_step, y_step) if y_step else repeat(y1, n)
+            yield from zip(xs, ys)
+
+def select_segments(segments, orientations):
+    return LineSet.from_segments(segments).filter(orientations)
+
+def rasterize(segments, bounds=None):
+    """
+    Yield the number of segments covering each cell of the bounding box, a
+    row at a time as a list indexed by x - x_min.
+    """
+    x_min, y_min, x_max, y_max = bounds or segments.bounds()
+    width, height = x_max - x_min + 1, y_max - y_min + 1
+    h_events = defaultdict(list)
+    events = defaultdict(list)
+    for x1, y1, x2, y2 in segments:
+        x1, x2, y1, y2 = x1 - x_min, x2 - x_min, y1 - y_min, y2 - y_min
+        if y1 > y2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        if y1 == y2:
+            h_events[y1].append((min(x1, x2), max(x1, x2)))
+            continue
+        if x1 == x2:
+            direction, index = 'v', x1
+        elif x2 > x1:
+            direction, index = 'd+', x1 - y1 + height - 1
+        else:
+            direction, index = 'd-', x1 + y1
+        events[y1].append((direction, index, 1))
+        events[y2 + 1].append((direction, index, -1))
+
+    counters = {'v': [0] * width, 'd+': [0] * (width + height), 
+                'd-': [0] * (width + height)}
+    active = {direction: 0 for direction in counters}
+    for y in range(height):
+        for direction, index, change in events.pop(y, ()):
+            counters[direction][index] += change
+            active[direction] += change
+        rows = []
+        if active['v']:
+            rows.append(counters['v'])
+        if active['d+']:
+            start = height - 1 - y
+            rows.append(counters['d+'][start:start + width])
+        if active['d-']:
+            rows.append(counters['d-'][y:y + width])
+        if y in h_events:
+            diff = [0] * (width + 1)
+            for xa, xb in h_events.pop(y):
+                diff[xa] += 1
+                diff[xb + 1] -= 1
+            rows.append(accumulate(diff[:-1]))
+        if not rows:
+            yield [0] * width
+            continue
+        row = rows[0]
+        for r in rows[1:]:
+            row = map(add, row, r)
+        yield list(row)
+
+def count_rows_overlaps(rows):
+    return sum(len(row) - row.count(0) - row.count(1) for row in rows)
+
+def count_sparse_overlaps(lines):
+    seafloor = Counter(lines.coords())
+    return sum(map((1).__lt__, seafloor.values()))
+
+def count_overlaps(segments, orientations, dense=None):
+    """
+    Count the points covered by at least two segments of the given
+    orientations. The seafloor is rasterized into dense rows unless its
+    bounding box is much larger than the total length of the lines, when the
+    covered points are counted sparsely instead. Pass dense to choose.
+    """
+    selected = select_segments(segments, orientations)
+    if not selected:
+        return 0
+    bounds = selected.bounds()
+    if dense is None:
+        area = (bounds[2] - bounds[0] + 1) * (bounds[3] - bounds[1] + 1)
+        dense = area <= DENSE_CELLS_PER_POINT * selected.n_points()
+    if dense:
+        return count_rows_overlaps(rasterize(selected, bounds))
+    return count_sparse_overlaps(selected)
+
+# Analytic overlaps ------------------------------------------------------------
+# Every line lies in one of four families: horizontal, vertical and the two
+# diagonals. Within a family a line is an interval of a parameter along a
+# line with a fixed key, a*x + b*y = key. Points covered twice within a
+# family come from overlapping intervals on the same key, and points covered
+# by two families are where a key of one crosses a covered interval of the
+# other. Neither needs the covered points to be listed, so memory grows with
+# the number of segments rather than their length.
+
+# family: (a, b) of its key, and whether its parameter is y rather than x
+FAMILIES = {'h': ((0, 1), False), 'v': ((1, 0), True), 
+            'd+': ((1, -1), False), 'd-': ((1, 1), False)}
+
+def get_family(x1, y1, x2, y2):
+    orientation = get_orientation(x1, y1, x2, y2)
+    if orientation == 'd':
+        return 'd+' if (x2 - x1) * (y2 - y1) > 0 else 'd-'
+    return orientation
+
+def family_position(family, x, y):
+    """Return the key and parameter of point x, y in a family."""
+    (a, b), param_is_y = FAMILIES[family]
+    return a*x + b*y, y if param_is_y else x
+
+def point_at(family, key, p):
+    """Return the point x, y at a key and parameter of a family."""
+    (a, b), param_is_y = FAMILIES[family]
+    if param_is_y:
+        return (key - b*p) // a, p
+    return p, (key - a*p) // b
+
+def merge_intervals(intervals):
+    """
+    Return the union of a key's intervals and the parts of it covered at
+    least twice, each as sorted lists of starts and ends.
+    """
+    union = ([], [])
+    overlap = ([], [])
+    reach = None
+    for start, end in sorted(intervals):
+        if reach is not None and start <= reach:
+            lo, hi = start, min(end, reach)
+            if overlap[0] and lo <= overlap[1][-1] + 1:
+                overlap[1][-1] = max(overlap[1][-1], hi)
+            else:
+                overlap[0].append(lo)
+                overlap[1].append(hi)
+        if union[0] and start <= union[1][-1] + 1:
+            union[1][-1] = max(union[1][-1], end)
+        else:
+            union[0].append(start)
+            union[1].append(end)
+        reach = end if reach is None else max(reach, end)
+    return union, overlap
+
+def in_intervals(intervals, p):
+    starts, ends = intervals
+    i = bisect_right(starts, p) - 1
+    return i >= 0 and p <= ends[i]
+
+def count_overlaps_analytic(segments, orientations):
+    """
+    Count the points covered by at least two segments of the given
+    orientations, as count_overlaps does, from the segment intervals alone.
+    """
+    intervals = defaultdict(lambda: defaultdict(list))
+    for s in select_segments(segments, orientations):
+        family = get_family(*s)
+        key, p1 = family_position(family, *s[:2])
+        _, p2 = family_position(family, *s[2:])
+        intervals[family][key].append((min(p1, p2), max(p1, p2)))
+
+    families = [f for f in FAMILIES if f in intervals]
+    unions, overlaps, keys = {}, {}, {}
+    danger_points = 0
+    for f in families:
+        unions[f], overlaps[f] = {}, {}
+        for key, key_intervals in intervals[f].items():
+            unions[f][key], overlaps[f][key] = merge_intervals(key_intervals)
+            starts, ends = overlaps[f][key]
+            danger_points += sum(ends) - sum(starts) + len(starts)
+        keys[f] = sorted(intervals[f])
+    del intervals
+
+    def covering_families(x, y):
+        for f in families:
+            key, p = family_position(f, x, y)
+            if key in unions[f] and in_intervals(unions[f][key], p):
+                yield f, in_intervals(overlaps[f][key], p)
+
+    for i, fa in enumerate(families):
+        (a1, b1), _ = FAMILIES[fa]
+        for fb in families[i + 1:]:
+            (a2, b2), _ = FAMILIES[fb]
+            det = a1*b2 - a2*b1
+            for ka, (starts, ends) in unions[fa].items():
+                for start, end in zip(starts, ends):
+                    ends_b = [family_position(fb, *point)[0] for point in 
+                              (point_at(fa, ka, start), point_at(fa, ka, end))]
+                    lo = bisect_left(keys[fb], min(ends_b))
+                    hi = bisect_right(keys[fb], max(ends_b))
+                    for kb in keys[fb][lo:hi]:
+                        x, x_rem = divmod(ka*b2 - kb*b1, det)
+                        y, y_rem = divmod(a1*kb - a2*ka, det)
+                        if x_rem or y_rem:
+                            continue
+                        _, pb = family_position(fb, x, y)
+                        if not in_intervals(unions[fb][kb], pb):
+                            continue
+                        # count each point once, from its first two
+                        # families, correcting for any family that already
+                        # counted it as an overlap within the family
+                        covering = list(covering_families(x, y))
+                        if [f for f, _ in covering[:2]] == [fa, fb]:
+                            danger_points += 1 - sum(o for _, o in covering)
+    return danger_points
+
+# Tiled seafloor ---------------------------------------------------------------
+# For surveys too large to sweep in one go the bounding box is cut into
+# square tiles. Each segment is clipped to the tiles it crosses and every
+# tile is rasterized in a worker process, writing its counts into its part
+# of an optional memory-mapped heatmap file.
+
+HEATMAP_MAX = 65535
+
+def clip_segment(segment, x_min, y_min, x_max, y_max):
+    """Return the part of a segment inside a box, or None if it misses."""
+    x1, y1, x2, y2 = segment
+    n = max(abs(x2 - x1), abs(y2 - y1))
+    t_lo, t_hi = 0, n
+    for start, end, lo, hi in ((x1, x2, x_min, x_max), (y1, y2, y_min, y_max)):
+        step = (end > start) - (end < start)
+        if step == 0:
+            if not lo <= start <= hi:
+                return None
+            continue
+        # start + step*t must lie in [lo, hi]
+        a, b = (lo - start) * step, (hi - start) * step
+        t_lo, t_hi = max(t_lo, min(a, b)), min(t_hi, max(a, b))
+    if t_lo > t_hi:
+        return None
+    x_step, y_step = (x2 > x1) - (x2 < x1), (y2 > y1) - (y2 < y1)
+    return (x1 + x_step * t_lo, y1 + y_step * t_lo, 
+            x1 + x_step * t_hi, y1 + y_step * t_hi)
+
+def bucket_segments(lines, bounds, tile_size):
+    """
+    Map each tile's (column, row) to its clipped segments, as a flat array
+    of x1, y1, x2, y2 values like parse_segments returns. A segment is
+    first clipped to each tile column it spans, and only the rows that piece
+    covers are tried, so a diagonal tries at most two tiles per column
+    rather than its whole bounding box.
+    """
+    x_min, y_min, _, _ = bounds
+    buckets = defaultdict(partial(array, 'q'))
+    for segment in lines:
+        x1, y1, x2, y2 = segment
+        seg_y_min, seg_y_max = min(y1, y2), max(y1, y2)
+        cols = range((min(x1, x2) - x_min) // tile_size, 
+                     (max(x1, x2) - x_min) // tile_size + 1)
+        for col in cols:
+            tx = x_min + col * tile_size
+            strip = clip_segment(segment, tx, seg_y_min, tx + tile_size - 1, 
+                                 seg_y_max)
+            if strip is None:
+                continue
+            _, sy1, _, sy2 = strip
+            rows = range((min(sy1, sy2) - y_min) // tile_size, 
+                         (max(sy1, sy2) - y_min) // tile_size + 1)
+            for row in rows:
+                ty = y_min + row * tile_size
+                clipped = clip_segment(strip, tx, ty, tx + tile_size - 1, 
+                                       ty + tile_size - 1)
+                if clipped is not None:
+                    buckets[col, row].extend(clipped)
+    return buckets
+
+def write_heatmap_header(f, width, height):
+    """Start a 16 bit PGM image, returning where its pixels begin."""
+    header = f'P5\n{width} {height}\n{HEATMAP_MAX}\n'.encode()
+    f.write(header)
+    f.truncate(len(header) + 2 * width * height)
+    return len(header)
+
+def _rasterize_tile(segments, tile_bounds, grid_bounds, heatmap_path, offset):
+    danger_points = 0
+    x_min, y_min, x_max, y_max = tile_bounds
+    grid_width = grid_bounds[2] - grid_bounds[0] + 1
+    mm = None
+    if heatmap_path is not None:
+        f = open(heatmap_path, 'r+b')
+        mm = mmap.mmap(f.fileno(), 0)
+    try:
+        rows = rasterize(LineSet.from_segments(segments), tile_bounds)
+        for y, row in enumerate(rows, y_min):
+            danger_points += len(row) - row.count(0) - row.count(1)
+            if mm is None:
+                continue
+            counts = array('H', map(min, row, repeat(HEATMAP_MAX)))
+            if sys.byteorder == 'little':
+                counts.byteswap()
+            start = offset + 2 * ((y - grid_bounds[1]) * grid_width 
+                                  + x_min - grid_bounds[0])
+            mm[start:start + 2 * len(counts)] = counts.tobytes()
+    finally:
+        if mm is not None:
+            mm.close()
+            f.close()
+    return danger_points
+
+def count_overlaps_tiled(segments, orientations, tile_size=1024, jobs=None,
+                         heatmap_path=None):
+    """
+    Count the points covered by at least two segments as count_overlaps
+    does, rasterizing tile_size square tiles in a pool of jobs worker
+    processes. With heatmap_path the per cell counts are also written there
+    as a 16 bit PGM image covering the bounding box, clipped at 65535.
+    """
+    lines = select_segments(segments, orientations)
+    if not lines:
+        return 0
+    bounds = lines.bounds()
+    x_min, y_min, x_max, y_max = bounds
+    offset = 0
+    if heatmap_path is not None:
+        with open(heatmap_path, 'wb') as f:
+            offset = write_heatmap_header(f, x_max - x_min + 1, 
+                                          y_max - y_min + 1)
+
+    buckets = bucket_segments(lines, bounds, tile_size)
+    del lines
+    # submit a few tiles per worker at a time, dropping each bucket once
+    # sent, so pending tiles don't pile up in the parent
+    jobs = jobs or os.cpu_count() or 1
+    danger_points = 0
+    pending = set()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while buckets:
+            (col, row), clipped = buckets.popitem()
+            tx, ty = x_min + col * tile_size, y_min + row * tile_size
+            tile = (tx, ty, min(tx + tile_size - 1, x_max), 
+                    min(ty + tile_size - 1, y_max))
+            pending.add(executor.submit(_rasterize_tile, clipped, tile, 
+                                        bounds, heatmap_path, offset))
+            if len(pending) >= 2 * jobs:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                danger_points += sum(f.result() for f in done)
+        danger_points += sum(f.result() for f in pending)
+    return danger_points
+
+def test_rasterize():
+    segments = parse_segments(load_test_data())
+    for orientations in [['h', 'v'], ['h', 'v', 'd'], ['d'], ['h']]:
+        expected = solve_puzzle(load_test_data(), orientations)
+        assert count_overlaps(segments, orientations, dense=True) == expected
+        assert count_overlaps(segments, orientations, dense=False) == expected
+        analytic = count_overlaps_analytic(segments, orientations)
+        assert analytic == expected
+    rows = list(rasterize(select_segments(segments, 'hvd')))
+    assert rows[0] == [1, 0, 1, 0, 0, 0, 0, 1, 1, 0]
+    assert rows[4] == [0, 1, 1, 2, 3, 1, 3, 2, 1, 1]
+
+def test_line_set():
+    lines = LineSet.from_segments(parse_segments(load_test_data()))
+    assert len(lines) == 10 and lines.orientations == b'hdhvvdhhdd'
+    assert lines[1] == (8, 0, 0, 8)
+    assert list(lines[2:4]) == [(9, 4, 3, 4), (2, 2, 2, 1)]
+    straight = lines.filter(['h', 'v'])
+    assert len(straight) == 6 and straight.orientations == b'hhvvhh'
+    assert list(straight[3:4].coords()) == [(7, 0), (7, 1), (7, 2), (7, 3), 
+                                            (7, 4)]
+    assert lines.n_points() == len(list(lines.coords())) == sum(
+        len(Line(l).coords) for l in load_test_data())
+    for columns in [[array('q', [1, 2])] * 3 + [array('q', [3])], 
+                    [array('q', [1])] * 4 + [b'hv']]:
+        try:
+            LineSet(*columns)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('expected ValueError for ragged columns')
+
+def test_malformed_segments():
+    data = ['0,0 -> 0,5', '3,1 -> 3', '0,2 -> 5,2', '1,1 -> 4,4']
+    try:
+        part_2(data)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('expected ValueError for a malformed segment')
+
+def test_analytic_huge_coordinates():
+    data = ["0,1000000 -> 2000000,1000000", "1000000,0 -> 1000000,2000000",
+            "0,0 -> 2000000,2000000", "500000,1000000 -> 1500000,1000000"]
+    segments = parse_segments(data)
+    assert count_overlaps_analytic(segments, ['h', 'v']) == 1000001
+    assert count_overlaps_analytic(segments, ['v', 'd']) == 1
+
+def test_tiled():
+    segments = parse_segments(load_test_data())
+    expected_rows = list(rasterize(select_segments(segments, 'hvd')))
+    with tempfile.TemporaryDirectory() as tmp:
+        heatmap_path = os.path.join(tmp, 'heatmap.pgm')
+        danger_points = count_overlaps_tiled(segments, 'hvd', tile_size=3, 
+                                             jobs=2, heatmap_path=heatmap_path)
+        with open(heatmap_path, 'rb') as f:
+            header = f.readline() + f.readline() + f.readline()
+            heatmap = array('H', f.read())
+    assert danger_points == 12
+    assert header == b'P5\n10 10\n65535\n'
+    if sys.byteorder == 'little':
+        heatmap.byteswap()
+    assert list(heatmap) == [c for row in expected_rows for c in row]
+    for tile_size in [1, 4, 100]:
+        assert count_overlaps_tiled(segments, 'hv', tile_size, jobs=1) == 5
+
+    # long diagonals are clipped only into the tiles they cross, at most two
+    # per column, and the pieces cover each point exactly once
+    for diagonal in [(0, 500, 99999, 100499), (7, 100000, 100006, 1)]:
+        buckets = bucket_segments([diagonal], (0, 0, 100006, 100499), 1000)
+        assert len(buckets) < 2 * 101
+        n_points = 0
+        for (col, row), pieces in buckets.items():
+            for x1, y1, x2, y2 in LineSet.from_segments(pieces):
+                assert {x1 // 1000, x2 // 1000} == {col}
+                assert {y1 // 1000, y2 // 1000} == {row}
+                n_points += abs(x2 - x1) + 1
+        assert n_points == 100000
+
+def part_1(data):
+    return count_overlaps(parse_segments(data), ['h', 'v'])
+
 def solution_1():
-    data = aoc2021.import_data(day=5)
-    danger_points = solve_puzzle(data, ['h', 'v'])
-    print('Danger points', danger_points)
+    data = aoc2021.stream_data(day=5)
+    print('Danger points', part_1(data))
 
 def test_puzzle_2():
     data = load_test_data()
     danger_points = solve_puzzle(data, ['h', 'v', 'd'])
     assert danger_points == 12
 
-def solution_2():
-    data = aoc2021.import_data(day=5)
-    danger_points = solve_puzzle(data, ['h', 'v', 'd'])
-    print('Danger points', danger_points)
+def part_2(data):
+    return count_overlaps(parse_segments(data), ['h', 'v', 'd'])
 
-# test_classes()
-test_puzzle_1()
-test_puzzle_2()
-solution_1()
-solution_2()
+def solution_2():
+    data = aoc2021.stream_data(day=5)
+    print('Danger points', part_2(data))
+
+if __name__ == "__main__":
+    # test_classes()
+    test_puzzle_1()
+    test_puzzle_2()
+    test_rasterize()
+    test_line_set()
+    test_malformed_segments()
+    test_tiled()
+    test_analytic_huge_coordinates()
+    solution_1()
+    solution_2()
 
 
@@ -88,20 +88,197 @@ How many lanternfish would there be after 256 days?
 """
 
 import aoc2021
+from collections import Counter
+
+def mat_mul(a, b, modulus=None):
+    product = [[sum(x * y for x, y in zip(row, col)) for col in zip(*b)] 
+                for row in a]
+    if modulus is not None:
+        product = [[x % modulus for x in row] for row in product]
+    return product
+
+def mat_vec(m, v, modulus=None):
+    product = [sum(x * y for x, y in zip(row, v)) for row in m]
+    if modulus is not None:
+        product = [x % modulus for x in product]
+    return product
+
+def transpose(m):
+    return [list(col) for col in zip(*m)]
+
+class PopulationModel():
+    """
+    An age structured population where every individual carries a timer
+    counting down to its next spawn. Adults spawn every spawn_cycle days and
+    newborns wait newborn_delay extra days before their first cycle. Each
+    day a survival fraction of the population lives on to the next, and
+    every spawning individual has spawn_rate offspring, a constant or a
+    function of the day.
+
+    The parameters compile into a sparse list of transitions for stepping
+    and a dense matrix whose cached powers fast-forward a model with a
+    constant spawn rate in log time.
+    """
+    def __init__(self, spawn_cycle=7, newborn_delay=2, survival=1, 
+                 spawn_rate=1):
+        self.spawn_cycle = spawn_cycle
+        self.newborn_delay = newborn_delay
+        self.n_states = spawn_cycle + newborn_delay
+        self.survival = survival
+        self.spawn_rate = spawn_rate
+        # matrix raised to each power of two, by modulus
+        self._matrix_powers = {}
+
+    def __repr__(self):
+        return (f'PopulationModel(spawn_cycle={self.spawn_cycle}, '
+                f'newborn_delay={self.newborn_delay}, '
+                f'survival={self.survival}, spawn_rate={self.spawn_rate})')
+
+    @property
+    def constant(self):
+        return not callable(self.spawn_rate)
+
+    def transitions(self, day=0):
+        """(to state, from state, weight) for each way a state moves on."""
+        rate = self.spawn_rate if self.constant else self.spawn_rate(day)
+        transitions = [(i-1, i, self.survival) for i in range(1, self.n_states)]
+        transitions.append((self.spawn_cycle - 1, 0, self.survival))
+        transitions.append((self.n_states - 1, 0, rate))
+        return transitions
+
+    def matrix(self, day=0):
+        """The matrix taking one day's state counts to the next day's."""
+        matrix = [[0] * self.n_states for _ in range(self.n_states)]
+        for to_state, from_state, weight in self.transitions(day):
+            matrix[to_state][from_state] += weight
+        return matrix
+
+    def step(self, states, day=0):
+        new_states = [0] * self.n_states
+        for to_state, from_state, weight in self.transitions(day):
+            new_states[to_state] += weight * states[from_state]
+        return new_states
+
+    def simulate(self, states, n_days, start_day=0):
+        """Yield the state counts on each day from start_day for n_days."""
+        states = list(states)
+        for day in range(start_day, start_day + n_days):
+            yield states
+            states = self.step(states, day)
+        yield states
+
+    def _matrix_power(self, k, modulus=None):
+        """The matrix to the power 2**k."""
+        powers = self._matrix_powers.setdefault(modulus, [self.matrix()])
+        while len(powers) <= k:
+            powers.append(mat_mul(powers[-1], powers[-1], modulus))
+        return powers[k]
+
+    def _check_constant(self):
+        if not self.constant:
+            raise ValueError('Fast-forwarding needs a constant spawn rate, '
+                             'use simulate or trajectories instead')
+
+    def matrix_power(self, n, modulus=None):
+        """The matrix to the power n, taking state counts n days on."""
+        self._check_constant()
+        power = [[int(i == j) for j in range(self.n_states)] 
+                    for i in range(self.n_states)]
+        k = 0
+        while n:
+            if n & 1:
+                power = mat_mul(power, self._matrix_power(k, modulus), modulus)
+            n >>= 1
+            k += 1
+        return power
+
+    def fast_forward(self, states, n, modulus=None):
+        """
+        Return a list of state counts n days after states, in O(log n)
+        matrix-vector products using the cached powers of two of the
+        matrix. With modulus the counts are reduced modulo it.
+        """
+        self._check_constant()
+        states = list(states)
+        k = 0
+        while n:
+            if n & 1:
+                states = mat_vec(self._matrix_power(k, modulus), states, 
+                                 modulus)
+            n >>= 1
+            k += 1
+        return states
+
+    def project(self, state_counts, days, modulus=None, breakdown=False):
+        """
+        Project many populations, the rows of an (M, n_states) matrix of
+        state counts, to each of a list of days. Returns an M by len(days)
+        table of population sizes or, with breakdown, of each population's
+        state counts. Each day costs one matrix power and one matrix product
+        for all populations.
+        """
+        projections = [[] for _ in state_counts]
+        for n in days:
+            power = self.matrix_power(n, modulus)
+            if breakdown:
+                rows = mat_mul(state_counts, transpose(power), modulus)
+            else:
+                # the population each individual at each timer grows into
+                weights = [sum(col) for col in zip(*power)]
+                rows = mat_vec(state_counts, weights, modulus)
+            for projection, row in zip(projections, rows):
+                projection.append(row)
+        return projections
+
+    def trajectories(self, state_counts, n_days, modulus=None, start_day=0):
+        """
+        Yield every population's state counts on each day from start_day for
+        n_days, as an (M, n_states) matrix per day.
+        """
+        step = transpose(self.matrix()) if self.constant else None
+        for day in range(start_day, start_day + n_days):
+            yield state_counts
+            day_step = step or transpose(self.matrix(day))
+            state_counts = mat_mul(state_counts, day_step, modulus)
+        yield state_counts
 
 class LanternfishShoal():
     
     n_states = 9
     timer_reset = 6
+    model = PopulationModel(spawn_cycle=timer_reset + 1, 
+                            newborn_delay=n_states - timer_reset - 1)
     
     def __init__(self, initial_states, age=0):
         self.initial_states = initial_states
+        self._states_by_day = {}
         self.set_states_to_initial()
         self.step_n_days(age)                
 
+    @classmethod
+    def transition_matrix(cls):
+        return cls.model.matrix()
+
+    @classmethod
+    def fast_forward(cls, states, n, modulus=None):
+        return cls.model.fast_forward(states, n, modulus)
+
+    @classmethod
+    def state_counts(cls, initial_states):
+        """Count the fish at each timer value of a '3,4,3,1,2' string."""
+        timers = Counter(aoc2021.parse_csv_ints(initial_states))
+        return [timers[i] for i in range(cls.n_states)]
+
+    @classmethod
+    def project(cls, state_counts, days, modulus=None, breakdown=False):
+        return cls.model.project(state_counts, days, modulus, breakdown)
+
+    @classmethod
+    def trajectories(cls, state_counts, n_days, modulus=None):
+        return cls.model.trajectories(state_counts, n_days, modulus)
+
     def set_states_to_initial(self):
-        self.states = {i: self.initial_states.count(str(i)) 
-                            for i in range(self.n_states)}           
+        self.states = dict(enumerate(self.state_counts(self.initial_states)))
 
     def next(self):
         new_states = {i-1: self.states[i] for i in range(1, self.n_states)}
@@ -109,16 +286,34 @@ class LanternfishShoal():
         new_states[self.n_states - 1] = self.states[0]
         self.states = new_states
     
+    def states_on_day(self, n, modulus=None):
+        """The state counts n days after the initial states, cached by day."""
+        if (n, modulus) not in self._states_by_day:
+            initial = self._states_by_day.get((0, None))
+            if initial is None:
+                self.set_states_to_initial()
+                initial = [self.states[i] for i in range(self.n_states)]
+                self._states_by_day[0, None] = initial
+            self._states_by_day[n, modulus] = self.fast_forward(initial, n, 
+                                                                modulus)
+        return self._states_by_day[n, modulus]
+
     def step_n_days(self, n, from_initial_states=True):
         if from_initial_states:
-            self.set_states_to_initial()
-        for i in range(n):
-            self.next()
+            states = self.states_on_day(n)
+        else:
+            states = self.fast_forward(
+                [self.states[i] for i in range(self.n_states)], n)
+        self.states = dict(enumerate(states))
         return self     
     
     def shoal_size(self):        
         return sum(self.states.values())
 
+    def size_on_day(self, n, modulus=None):
+        size = sum(self.states_on_day(n, modulus))
+        return size if modulus is None else size % modulus
+
 def test_shoal():
     initial_state = "3,4,3,1,2"
     test_shoal = LanternfishShoal(initial_state)
@@ -127,8 +322,69 @@ def test_shoal():
         test_size = test_shoal.step_n_days(k).shoal_size()
         assertion_msg = f'Expected day {k} size: {v}, returned: {test_size}'
         assert test_size == v, assertion_msg    
+        assert test_shoal.size_on_day(k) == v
+        assert test_shoal.size_on_day(k, modulus=1000) == v % 1000
+    stepped = LanternfishShoal(initial_state)
+    for _ in range(18):
+        stepped.next()
+    assert stepped.shoal_size() == 26
+    assert stepped.step_n_days(62, from_initial_states=False).shoal_size() \
+        == 5934
+    assert test_shoal.size_on_day(10**12, modulus=10**9 + 7) >= 0
     print("Tests passed")
 
+def test_projections():
+    shoals = ["3,4,3,1,2", "1", "8,8,0"]
+    counts = [LanternfishShoal.state_counts(s) for s in shoals]
+    days = [0, 18, 80, 256]
+    sizes = LanternfishShoal.project(counts, days)
+    assert sizes[0] == [5, 26, 5934, 26984457539]
+    for shoal, shoal_sizes in zip(shoals, sizes):
+        fish = LanternfishShoal(shoal)
+        assert shoal_sizes == [fish.size_on_day(n) for n in days]
+    breakdown = LanternfishShoal.project(counts, days, breakdown=True)
+    assert [sum(b) for b in breakdown[2]] == sizes[2]
+    assert breakdown[1][1] == LanternfishShoal("1").states_on_day(18)
+    trajectory = list(LanternfishShoal.trajectories(counts, 18))
+    assert len(trajectory) == 19
+    assert [sum(row) for row in trajectory[18]] == [s[1] for s in sizes]
+    print("Projection tests passed")
+
+def test_population_model():
+    fish = PopulationModel(spawn_cycle=7, newborn_delay=2)
+    counts = LanternfishShoal.state_counts("3,4,3,1,2")
+    assert sum(fish.fast_forward(counts, 80)) == 5934
+    days = list(fish.simulate(counts, 80))
+    assert len(days) == 81 and sum(days[18]) == 26 and sum(days[80]) == 5934
+
+    # a time varying spawn rate can't fast-forward but can still step
+    seasonal = PopulationModel(spawn_rate=lambda day: day % 2)
+    # spawning on day 0 is skipped, the next spawn on day 7 goes ahead
+    assert [sum(s) for s in seasonal.simulate([1] + [0] * 8, 8)] == \
+        [1] * 8 + [2]
+    assert [sum(s) for s in seasonal.simulate([0, 1] + [0] * 7, 8)] == \
+        [1, 1, 2, 2, 2, 2, 2, 2, 2]
+    try:
+        seasonal.fast_forward(counts, 10)
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+
+    dying = PopulationModel(spawn_cycle=3, newborn_delay=1, survival=0.5, 
+                            spawn_rate=2)
+    stepped = list(dying.simulate([4, 0, 0, 0], 20))[-1]
+    jumped = dying.fast_forward([4, 0, 0, 0], 20)
+    assert all(abs(a - b) < 1e-9 for a, b in zip(stepped, jumped))
+    rows = list(dying.trajectories([[4, 0, 0, 0], [0, 0, 0, 4]], 20))[-1]
+    assert all(abs(a - b) < 1e-9 for a, b in zip(rows[0], jumped))
+    print("Population model tests passed")
+
+def part_1(data, days=80):
+    return LanternfishShoal(''.join(data)).step_n_days(days).shoal_size()
+
+def part_2(data):
+    return part_1(data, days=256)
+
 def solution():
     initial_state = aoc2021.import_data(day=6, as_list=False)
     lanternfish_shoal = LanternfishShoal(initial_state)
@@ -138,6 +394,8 @@ def solution():
 
 if __name__ == "__main__":
     test_shoal()
+    test_projections()
+    test_population_model()
     solution()
     
 
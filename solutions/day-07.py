@@ -82,45 +82,347 @@ spend to align to that position?
 
 """
 
-from aoc2021 import import_data
-from statistics import mean
+from aoc2021 import import_data, parse_csv_ints
+from math import floor
+from fractions import Fraction
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import mul
+from functools import partial
+from itertools import accumulate, islice, product
+from collections import Counter
+
+def triangular(d):
+    return d * (d + 1) // 2
+
+def _halve(total):
+    # weighted triangular totals are exact halves for integer weights only
+    return total // 2 if isinstance(total, int) else total / 2
+
+class FuelCostIndex():
+    """
+    A histogram of crab positions, with prefix counts, sums and sums of
+    squares over its distinct positions. The linear cost to a target is
+    found from the count and sum of the positions either side of it, and
+    the triangular cost, half the sum of squared distances plus the sum of
+    distances, from the sums of squares too, so each target costs
+    O(log distinct) however many crabs and however wide their range.
+    Histogram values are weights, so weighted crabs cost nothing extra.
+    """
+    # the cost to a target given how many distinct positions lie up to it
+    COST_AT = {'linear_cost': '_linear_at', 'squared_cost': '_squared_at',
+               'triangular_cost': '_triangular_at'}
+
+    def __init__(self, histogram):
+        self.distinct = sorted(histogram)
+        self.lo, self.hi = self.distinct[0], self.distinct[-1]
+        self.weights = [histogram[p] for p in self.distinct]
+        self.counts = [0, *accumulate(self.weights)]
+        moments = list(map(mul, self.weights, self.distinct))
+        self.sums = [0, *accumulate(moments)]
+        self.squares = [0, *accumulate(map(mul, moments, self.distinct))]
+
+    @classmethod
+    def from_positions(cls, positions, weights=None):
+        if weights is None:
+            return cls(Counter(positions))
+        histogram = Counter()
+        for position, weight in zip(positions, weights):
+            histogram[position] += weight
+        return cls(histogram)
+
+    def median(self):
+        """The lowest position with at least half the weight up to it."""
+        # halved as a Fraction so huge integer weights compare exactly
+        i = bisect_left(self.counts, Fraction(self.counts[-1]) / 2)
+        return self.distinct[i - 1]
+
+    def mean(self):
+        return self.sums[-1] / self.counts[-1]
+
+    def floor_mean(self):
+        """The mean rounded down, exactly however large the positions."""
+        return floor(Fraction(self.sums[-1]) / Fraction(self.counts[-1]))
+
+    def _linear_at(self, i, target):
+        """The linear cost to target, given the first i positions up to it."""
+        n_below, sum_below = self.counts[i], self.sums[i]
+        n_above = self.counts[-1] - n_below
+        sum_above = self.sums[-1] - sum_below
+        return (target * n_below - sum_below) + (sum_above - target * n_above)
+
+    def _squared_at(self, i, target):
+        return self.squared_cost(target)
+
+    def _triangular_at(self, i, target):
+        return _halve(self.squared_cost(target) + self._linear_at(i, target))
+
+    def linear_cost(self, target):
+        return self._linear_at(bisect_right(self.distinct, target), target)
+
+    def squared_cost(self, target):
+        n, total, squares = self.counts[-1], self.sums[-1], self.squares[-1]
+        return squares - 2 * target * total + target * target * n
+
+    def triangular_cost(self, target):
+        i = bisect_right(self.distinct, target)
+        return self._triangular_at(i, target)
+
+    def total_cost(self, cost, target):
+        """
+        The total of a CostFunction to target, from the prefix sums if it
+        has an indexed form, otherwise evaluated once per distinct position
+        and weighted by the histogram.
+        """
+        if cost.index_cost is not None:
+            return getattr(self, cost.index_cost)(target)
+        distances = (abs(p - target) for p in self.distinct)
+        return sum(map(mul, self.weights, map(cost.fn, distances)))
+
+    def cost_curve(self, cost_fn, lo=None, hi=None):
+        """
+        The cost to every target from lo to hi, default the crab range, of
+        a CostFunction or any function of the target. An indexed cost walks
+        the targets and the distinct positions together, advancing the
+        prefix index rather than bisecting, so costs O(range + distinct).
+        """
+        lo = self.lo if lo is None else lo
+        hi = self.hi if hi is None else hi
+        index_cost = getattr(cost_fn, 'index_cost', None)
+        if index_cost is None:
+            if isinstance(cost_fn, CostFunction):
+                cost_fn = partial(self.total_cost, cost_fn)
+            return [cost_fn(t) for t in range(lo, hi + 1)]
+
+        cost_at = getattr(self, self.COST_AT[index_cost])
+        distinct, n_distinct = self.distinct, len(self.distinct)
+        i = bisect_right(distinct, lo)
+        curve = []
+        for t in range(lo, hi + 1):
+            while i < n_distinct and distinct[i] <= t:
+                i += 1
+            curve.append(cost_at(i, t))
+        return curve
+
+class CostFunction():
+    """
+    The fuel one crab burns to move a distance. Declaring it convex lets the
+    optimiser search the total cost instead of scanning every target, and
+    index_cost names a FuelCostIndex method giving the total in O(1). A
+    piecewise linear cost may instead give the distances of its kinks as
+    breakpoints, so only targets that far from a crab need checking.
+    """
+    __slots__ = ('name', 'fn', 'convex', 'index_cost', 'breakpoints')
+
+    def __init__(self, name, fn, convex=True, index_cost=None, 
+                 breakpoints=None):
+        self.name, self.fn = name, fn
+        self.convex, self.index_cost = convex, index_cost
+        self.breakpoints = breakpoints
+
+    def __call__(self, distance):
+        return self.fn(distance)
+
+    def __repr__(self):
+        return f'CostFunction({self.name!r}, convex={self.convex})'
+
+COST_FUNCTIONS = {}
+
+def register_cost_function(name, fn, convex=True, index_cost=None):
+    COST_FUNCTIONS[name] = CostFunction(name, fn, convex, index_cost)
+    return COST_FUNCTIONS[name]
+
+register_cost_function('linear', lambda d: d, index_cost='linear_cost')
+register_cost_function('triangular', triangular, index_cost='triangular_cost')
+register_cost_function('quadratic', lambda d: d * d, 
+                       index_cost='squared_cost')
+
+def capped_cost(cap, name=None):
+    """
+    Linear fuel up to cap and flat beyond it. The plateau makes the total
+    non-convex, but it is piecewise linear with kinks only at and cap
+    either side of each crab, so only those targets are checked.
+    """
+    return CostFunction(name or f'capped_{cap}', lambda d: min(d, cap),
+                        convex=False, breakpoints=(0, cap))
+
+def get_cost_function(cost):
+    if isinstance(cost, CostFunction):
+        return cost
+    if cost not in COST_FUNCTIONS:
+        raise ValueError(f'unknown cost function {cost!r}, expected one of '
+                         f'{", ".join(COST_FUNCTIONS)}')
+    return COST_FUNCTIONS[cost]
+
+def minimise_convex(cost_fn, lo, hi):
+    """
+    The lowest integer in lo..hi minimising a convex cost_fn, by bisecting
+    on the sign of its forward difference in O(log(hi - lo)) evaluations.
+    """
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cost_fn(mid + 1) < cost_fn(mid):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def find_optimum(index, cost):
+    """
+    The cheapest (cost, position) for crabs in index to align under cost.
+    Linear fuel is minimised at the weighted median. Triangular fuel is half
+    the sum of squared distances plus the sum of distances, so its minimum
+    lies within half a step of the mean and only the integers around the
+    mean need checking, found from the exact floor of the mean as a float
+    mean is too coarse for huge positions. Every cost grows with distance, so other convex
+    costs are minimised by bisection within the crab range. A piecewise
+    linear cost is minimised at a kink or an end of the range, so only
+    its breakpoints either side of each crab are checked, and any other
+    cost by scanning the range.
+    """
+    def cost_fn(target):
+        return index.total_cost(cost, target)
+
+    if cost.index_cost == 'linear_cost':
+        candidates = [index.median()]
+    elif cost.index_cost == 'triangular_cost':
+        q = index.floor_mean()
+        candidates = range(q - 1, q + 3)
+    elif cost.convex:
+        candidates = [minimise_convex(cost_fn, index.lo, index.hi)]
+    elif cost.breakpoints is not None:
+        candidates = {min(max(p + sign * d, index.lo), index.hi)
+                      for p in index.distinct for d in cost.breakpoints
+                      for sign in (-1, 1)}
+    else:
+        candidates = range(index.lo, index.hi + 1)
+    return min((cost_fn(t), t) for t in candidates)
+
+def fleet_chunks(lines, weighted=False, chunk_size=1 << 20):
+    """
+    Yield (coordinates, weights) chunks of at most chunk_size units from
+    lines of comma separated coordinates, with a trailing weight if weighted,
+    as one array per axis so no more than a chunk is held at once.
+    """
+    lines = ((line_no, line) for line_no, line in enumerate(lines, 1) 
+             if line.strip())
+    n_fields = None
+    while True:
+        rows = []
+        for line_no, line in islice(lines, chunk_size):
+            row = list(map(int, line.split(',')))
+            if n_fields is None:
+                n_fields = len(row)
+                if n_fields < 1 + weighted:
+                    raise ValueError(f'line {line_no}: expected coordinates'
+                                     f'{" and a weight" if weighted else ""}'
+                                     f', got {line!r}')
+            elif len(row) != n_fields:
+                raise ValueError(f'line {line_no}: expected {n_fields} '
+                                 f'fields, got {line!r}')
+            rows.append(row)
+        if not rows:
+            return
+        columns = [array('q', column) for column in zip(*rows)]
+        if weighted:
+            yield columns[:-1], columns[-1]
+        else:
+            yield columns, None
+
+class Fleet():
+    """
+    Weighted units in any number of dimensions to gather at one point, where
+    each unit's fuel is a cost of its distance along each axis summed over
+    the axes. Such a cost separates, so each axis is optimised alone over a
+    weighted FuelCostIndex: at the weighted median for linear fuel, about
+    the weighted mean for triangular, and by search for other costs.
+    """
+    def __init__(self, histograms):
+        self.indexes = [FuelCostIndex(h) for h in histograms]
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        Build from an iterable of (coordinates, weights) chunks, coordinates
+        holding one array per axis and weights None for unit weights. Only
+        the per-axis histograms are kept, so chunks may be streamed.
+        """
+        histograms = None
+        for coordinates, weights in chunks:
+            if histograms is None:
+                histograms = [Counter() for _ in coordinates]
+            elif len(coordinates) != len(histograms):
+                raise ValueError(f'expected {len(histograms)} axes, '
+                                 f'got {len(coordinates)}')
+            for histogram, axis in zip(histograms, coordinates):
+                if weights is None:
+                    histogram.update(axis)
+                    continue
+                for position, weight in zip(axis, weights):
+                    histogram[position] += weight
+        if histograms is None:
+            raise ValueError('no units in fleet')
+        return cls(histograms)
+
+    @classmethod
+    def from_coordinates(cls, coordinates, weights=None):
+        return cls.from_chunks([(coordinates, weights)])
+
+    @property
+    def dims(self):
+        return len(self.indexes)
+
+    def fuel_cost_to_target(self, target, cost='linear'):
+        cost = get_cost_function(cost)
+        return sum(index.total_cost(cost, t) 
+                   for index, t in zip(self.indexes, target))
+
+    def find_optimum(self, cost='linear'):
+        """The cheapest (cost, position) with position a tuple of axes."""
+        cost = get_cost_function(cost)
+        optima = [find_optimum(index, cost) for index in self.indexes]
+        return sum(c for c, _ in optima), tuple(t for _, t in optima)
 
 class Crabs():
-    def __init__(self, initial_positions, exponential_fuel=False):
-        self.positions = [int(i) for i in initial_positions.split(',')]
+    """
+    Crabs to align at the cheapest position. cost is a registered cost name
+    or a CostFunction, defaulting to linear or, with exponential_fuel, 
+    triangular fuel, and weights scale each crab's fuel.
+    """
+    def __init__(self, initial_positions, exponential_fuel=False, cost=None,
+                 weights=None):
+        self.positions = parse_csv_ints(initial_positions)
         self.exponential_fuel = exponential_fuel
-        if exponential_fuel:
-            self.fuel_fn = self.exponential_fuel_fn
-        else:
-            self.fuel_fn = self.linear_fuel_fn
-        self.optimum_position = int(mean(self.positions))
+        if cost is None:
+            cost = 'triangular' if exponential_fuel else 'linear'
+        self.cost = get_cost_function(cost)
+        self.weights = weights
+        self.index = FuelCostIndex.from_positions(self.positions, weights)
         self.find_optimum_position()
     
     def find_optimum_position(self):
-        self.optimum_position = int(mean(self.positions))
-        self.optimum_cost = self.fuel_cost_to_target(self.optimum_position)
-        # try increasing positon
-        next_cost = self.fuel_cost_to_target(self.optimum_position+1)
+        self.optimum_cost, self.optimum_position = find_optimum(self.index, 
+                                                                self.cost)
 
-        if next_cost < self.optimum_cost:
-            step = 1
-        else:
-            next_cost = self.fuel_cost_to_target(self.optimum_position-1)
-            step = -1
-
-        while next_cost < self.optimum_cost:
-            self.optimum_position += step
-            self.optimum_cost = next_cost
-            next_cost = self.fuel_cost_to_target(self.optimum_position + step)
+    def fuel_fn(self, position, target):
+        return self.cost(abs(position - target))
 
     def exponential_fuel_fn(self, position, target):
-        return sum(range(1, abs(position - target)+1))
+        return triangular(abs(position - target))
         
     def linear_fuel_fn(self, position, target):
         return abs(position - target)
 
     def fuel_cost_to_target(self, target):        
-        return sum([self.fuel_fn(p, target) for p in self.positions])
+        return self.index.total_cost(self.cost, target)
+
+    def fuel_cost_curve(self, lo=None, hi=None):
+        """The fuel cost to every target from lo to hi, default all crabs."""
+        return self.index.cost_curve(self.cost, lo, hi)
+
+    def find_optimum_among(self, allowed_positions):
+        """The cheapest (cost, position) of only the allowed positions."""
+        return min((self.fuel_cost_to_target(t), t) for t in allowed_positions)
 
 def test_crabs():
     def assertion(expected_cost, fuel_cost, optimum_pos):
@@ -139,8 +441,134 @@ def test_crabs():
     expected_exponential_cost = 168
     assertion(expected_exponential_cost, exponential_cost, 
         test_crabs.optimum_position)
+
+    # the closed form optimum and indexed costs match a search of every
+    # position costed crab by crab
+    for crabs in [test_crabs, test_exponential_crabs]:
+        curve = [sum(crabs.fuel_fn(p, t) for p in crabs.positions) 
+                 for t in range(-3, 20)]
+        assert crabs.fuel_cost_curve(-3, 19) == curve
+        assert crabs.optimum_cost == min(curve)
+        fuel_fn_cost = sum(crabs.fuel_fn(p, crabs.optimum_position) 
+                           for p in crabs.positions)
+        assert crabs.optimum_cost == fuel_fn_cost
+    assert test_crabs.find_optimum_among([5, 10]) == (45, 5)
+
+    # a few crabs spread over a huge range cost only their distinct positions
+    sparse = '0,1,2,30000000,-1000000000000'
+    for crabs in [Crabs(sparse), Crabs(sparse, exponential_fuel=True)]:
+        assert len(crabs.index.counts) == 6
+        t = crabs.optimum_position
+        costs = [sum(crabs.fuel_fn(p, target) for p in crabs.positions)
+                 for target in [t - 1, t, t + 1]]
+        assert crabs.optimum_cost == costs[1] == min(costs)
+    assert Crabs(sparse).optimum_position == 1
+
+    # positions beyond float precision still find the exact optimum
+    huge = [73834621518161284, -99024880992560497, 95401244793246614, 
+            -2607859722337365]
+    crabs = Crabs(','.join(map(str, huge)), exponential_fuel=True)
+    index = crabs.index
+    exact = minimise_convex(index.triangular_cost, index.lo, index.hi)
+    assert crabs.optimum_position == exact
+    assert crabs.optimum_cost == index.triangular_cost(exact)
+    heavy = Crabs('0,1,2', weights=[10**20, 1, 10**20 + 2])
+    assert heavy.optimum_position == 2
     print("Test passed")
 
+def test_cost_functions():
+    # every registered and capped cost, weighted or not, matches a search of
+    # every position costed crab by crab
+    test_input = '16,1,2,0,4,2,7,1,2,14'
+    weights = [1, 3, 2, 1, 1, 2, 5, 1, 1, 4]
+    costs = [*COST_FUNCTIONS.values(), capped_cost(3)]
+    for cost in costs:
+        for crab_weights in [None, weights]:
+            crabs = Crabs(test_input, cost=cost, weights=crab_weights)
+            crab_weights = crab_weights or [1] * len(crabs.positions)
+            curve = [sum(w * crabs.fuel_fn(p, t) 
+                         for p, w in zip(crabs.positions, crab_weights))
+                     for t in range(-3, 20)]
+            assert crabs.fuel_cost_curve(-3, 19) == curve, cost
+            assert crabs.optimum_cost == min(curve), cost
+    assert Crabs(test_input, cost='quadratic').optimum_position == 5
+
+    # the walked curve matches costing each target alone
+    crabs = Crabs('3,3,10,40,41', weights=[2, 1, 5, 1, 3])
+    for cost in COST_FUNCTIONS.values():
+        assert crabs.index.cost_curve(cost, -5, 50) == [
+            crabs.index.total_cost(cost, t) for t in range(-5, 51)]
+
+    # capped costs check only their breakpoints, however wide the range
+    crabs = Crabs('0,1,2,3000000', cost=capped_cost(3))
+    assert (crabs.optimum_cost, crabs.optimum_position) == (5, 1)
+
+    # bisection finds the minimum of a skewed convex cost at either end
+    assert minimise_convex(lambda t: (t - 999) ** 2, 0, 1000) == 999
+    assert minimise_convex(lambda t: abs(t), 0, 1000) == 0
+    try:
+        Crabs(test_input, cost='cubic')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('expected ValueError for an unknown cost')
+    print("Test passed")
+
+def test_fleet():
+    # per axis optima match a search of every point near the units costed
+    # unit by unit, and chunked streaming builds the same fleet
+    units = [(0, 5, 2), (3, 1, 1), (7, 7, 4), (2, 9, 3), (3, 3, 1), (8, 0, 2)]
+    lines = [','.join(map(str, unit)) for unit in units]
+    (x, y, w), = [columns for columns, _ in fleet_chunks(lines)]
+    fleet = Fleet.from_coordinates([x, y], w)
+    chunked = Fleet.from_chunks(fleet_chunks(lines, weighted=True, 
+                                             chunk_size=4))
+    for cost in [COST_FUNCTIONS['linear'], COST_FUNCTIONS['triangular']]:
+        brute = min((sum(w * (cost(abs(x - tx)) + cost(abs(y - ty)))
+                         for x, y, w in units), (tx, ty))
+                    for tx, ty in product(range(-1, 11), repeat=2))
+        optimum = fleet.find_optimum(cost)
+        assert optimum[0] == brute[0], (cost, optimum, brute)
+        assert fleet.fuel_cost_to_target(optimum[1], cost) == brute[0]
+        assert chunked.find_optimum(cost) == optimum
+
+    # blank lines anywhere in the stream are skipped, not taken as its end
+    lines = ['1,2', '', '', '3,4', '5,6', '']
+    x, y = Fleet.from_chunks(fleet_chunks(lines, chunk_size=1)).indexes
+    assert x.distinct == [1, 3, 5] and y.distinct == [2, 4, 6]
+
+    # ragged lines raise rather than dropping an axis or taking a coordinate
+    # as the weight
+    for lines, weighted in [(['1,2,3', '4,5'], False), 
+                            (['1,2,1', '', '4,5'], True), (['7'], True)]:
+        try:
+            list(fleet_chunks(lines, weighted))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f'expected ValueError for {lines}')
+
+    # wide 3-D coordinates cost only their distinct values per axis
+    wide = [array('q', [-10**12, 0, 10**12, 5]), 
+            array('q', [10**15, 3, 3, -10**15]), array('q', [0, 0, 1, 0])]
+    fleet = Fleet.from_coordinates(wide, [1, 2, 1, 1])
+    assert [len(index.distinct) for index in fleet.indexes] == [4, 3, 2]
+    assert fleet.find_optimum() == (2 * 10**12 + 5 + 2 * 10**15 + 1, 
+                                    (0, 3, 0))
+
+    # one axis of unit weights is the crab puzzle
+    crabs = [array('q', [16, 1, 2, 0, 4, 2, 7, 1, 2, 14])]
+    assert Fleet.from_coordinates(crabs).find_optimum() == (37, (2,))
+    assert Fleet.from_coordinates(crabs).find_optimum('triangular') == (168, 
+                                                                        (5,))
+    print("Test passed")
+
+def part_1(data):
+    return Crabs(''.join(data)).optimum_cost
+
+def part_2(data):
+    return Crabs(''.join(data), exponential_fuel=True).optimum_cost
+
 def solution():
     initial_positions = import_data(7, as_list=False)
     crabs = Crabs(initial_positions)
@@ -152,4 +580,6 @@ def solution():
 
 if __name__ == "__main__":
     test_crabs()
+    test_cost_functions()
+    test_fleet()
     solution()
\ No newline at end of file